@@ -0,0 +1,158 @@
+"""
+Database router sending the reads of safe-method requests to read replicas.
+
+Docs: https://docs.djangoproject.com/en/4.2/topics/db/multi-db/#automatic-database-routing
+"""
+
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+# NOTE: Sessions and auth models, the user model (settings.AUTH_USER_MODEL) too,
+# are read by authentication itself, always on the primary: a session just saved
+# is found, a revoked token version or a deactivated user is never read back
+# from a lagging replica (and cached), and the router never needs the user to
+# route the queries loading the user
+PRIMARY_APP_LABELS = ("auth", "sessions")
+RECENT_WRITE_CACHE_KEY = "db:recent_write:{user_id}"
+
+# NOTE: Lag of a Postgres standby, 0 when it replayed everything it received
+# (an idle primary doesn't make a replica look late) or when not a standby
+POSTGRES_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+"""
+
+
+class RequestState:
+    """Routing state of the request being served."""
+
+    def __init__(self, request):
+        self.request = request
+        self.replica = None
+        self.wrote = False
+        self.pinned = None
+
+
+# Set by app.middleware.ReplicaRoutingMiddleware, None outside of requests
+# (Celery tasks, management commands), which then use the primary only
+current_request = ContextVar("db_router_request", default=None)
+
+# alias: (checked at, fresh enough)
+_replica_status = {}
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary."""
+    connection = connections[alias]
+    if connection.vendor != "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRES_LAG_SQL)
+        return float(cursor.fetchone()[0])
+
+
+def replica_is_fresh(alias):
+    """Whether the replica lags less than MAX_LAG_SECONDS, checked every LAG_CHECK_INTERVAL."""
+    config = settings.REPLICA_ROUTING
+    checked = _replica_status.get(alias)
+    now = time.monotonic()
+    if checked is not None and now - checked[0] < config["LAG_CHECK_INTERVAL"]:
+        return checked[1]
+
+    try:
+        fresh = replica_lag(alias) <= config["MAX_LAG_SECONDS"]
+    except DatabaseError:
+        # Unreachable replicas are skipped too
+        fresh = False
+    _replica_status[alias] = (now, fresh)
+    return fresh
+
+
+def pin_to_primary(user_id):
+    """Send the reads of the user to the primary for STICKY_SECONDS (read your writes)."""
+    cache.set(
+        RECENT_WRITE_CACHE_KEY.format(user_id=user_id),
+        True,
+        settings.REPLICA_ROUTING["STICKY_SECONDS"],
+    )
+
+
+def _known_user(request):
+    """
+    The user of the request if already loaded, None otherwise.
+
+    NOTE: Never evaluates the lazy request.user of AuthenticationMiddleware:
+    loading the user runs queries, which come back to the router.
+    """
+    user = getattr(request, "_cached_user", None)
+    if user is None:
+        user = getattr(request, "user", None)
+        if isinstance(user, SimpleLazyObject):
+            return None
+    return user
+
+
+def _pinned_to_primary(state):
+    if state.pinned is None:
+        # NOTE: DRF sets request.user once the view authenticated the request,
+        # reads running before (authentication itself) don't know the user yet
+        user = _known_user(state.request)
+        if user is None or not user.is_authenticated:
+            return False
+        state.pinned = cache.get(RECENT_WRITE_CACHE_KEY.format(user_id=user.pk), False)
+    return state.pinned
+
+
+class ReplicaRouter:
+    """
+    Route reads to a replica of settings.REPLICA_ROUTING["ALIASES"], writes to the primary.
+
+    Reads go to the primary when:
+    - not in a request, or in a request with an unsafe method (POST, PUT, ...)
+    - they read sessions, auth models (PRIMARY_APP_LABELS) or the user model
+    - the request already wrote, or a transaction is open on the primary
+    - the user wrote in the last STICKY_SECONDS (see pin_to_primary)
+    - every replica lags more than MAX_LAG_SECONDS
+    A request reads from a single replica, picked at random at its first read.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = current_request.get()
+        if state is None or state.wrote or state.request.method not in SAFE_METHODS:
+            return DEFAULT_DB_ALIAS
+        label = model._meta.concrete_model._meta.label
+        if model._meta.app_label in PRIMARY_APP_LABELS or label == settings.AUTH_USER_MODEL:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block or _pinned_to_primary(state):
+            return DEFAULT_DB_ALIAS
+
+        if state.replica is None:
+            fresh = [
+                alias for alias in settings.REPLICA_ROUTING["ALIASES"] if replica_is_fresh(alias)
+            ]
+            state.replica = random.choice(fresh) if fresh else DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = current_request.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Every database holds the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get the schema through replication
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,211 @@
+"""
+Read-only serializers compiled from DRF serializers, for large lists.
+
+A ModelSerializer builds its field objects for every instance and calls
+to_representation() field by field on model instances. CompiledSerializer
+reads the fields of a serializer once, fetches the rows with .values() (no
+model instances) and turns each row into a dict with one generated function:
+
+    def convert(row):
+        return {"id": row["id"], "price": (None if row["price"] is None else _price(row["price"]))}
+
+The output is the one of the serializer it was compiled from, which the
+parity tests of the apps using it check.
+"""
+
+from collections import defaultdict
+from itertools import islice
+
+from app.renderers import ORJSONRenderer
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from django.utils.functional import cached_property
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# NOTE: Fields whose to_representation() returns the database value unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.FloatField,
+    serializers.IntegerField,
+)
+UNSUPPORTED_FIELDS = (
+    serializers.FileField,
+    serializers.HiddenField,
+    serializers.ManyRelatedField,
+    serializers.SerializerMethodField,
+)
+
+PARENT_KEY = "_compiled_parent_key"
+
+# Rows fetched from the server-side cursor, and serialized, at a time
+STREAM_CHUNK_SIZE = 2000
+
+
+class CompiledSerializer:
+    """
+    Read-only version of a serializer, for lists.
+
+    sources maps fields the serializer computes in Python (SerializerMethodField)
+    to a column or annotation of the queryset holding the same value.
+    nested maps nested many=True serializer fields of a reverse foreign key
+    to the CompiledSerializer of their child, whose rows it fetches in one
+    more query (like prefetch_related).
+    """
+
+    def __init__(self, serializer_class, sources=None, nested=None, queryset=None):
+        self.serializer_class = serializer_class
+        self.sources = sources or {}
+        self.nested = nested or {}
+        # Base queryset when used as a nested serializer
+        self.queryset = queryset
+
+    @cached_property
+    def _compiled(self):
+        """(values() paths, row to dict function, nested relations), built at first use."""
+        model = self.serializer_class.Meta.model
+        paths = []
+        relations = {}
+        namespace = {}
+        items = []
+        for field in self.serializer_class()._readable_fields:
+            name = field.field_name
+            if name in self.nested:
+                # The reverse foreign key, e.g. OrderItem.order for Order.items
+                relations[name] = model._meta.get_field(field.source).field
+                # Filled in by serialize(), after the query of the children
+                items.append(f"{name!r}: []")
+                continue
+            path = self._path(field)
+            paths.append(path)
+            value = f"row[{path!r}]"
+            convert = self._converter(field)
+            if convert is not None:
+                namespace[f"_{name}"] = convert
+                value = f"(None if {value} is None else _{name}({value}))"
+            items.append(f"{name!r}: {value}")
+
+        # The children are matched to their parent on the key their foreign key points to
+        for relation in relations.values():
+            if relation.target_field.attname not in paths:
+                paths.append(relation.target_field.attname)
+
+        source = "def convert(row):\n    return {" + ", ".join(items) + "}\n"
+        # NOTE: The field list is known once, so is the code turning a row into a dict:
+        # no loop over fields, no field objects, no attribute lookups per row
+        exec(compile(source, f"<compiled {self.serializer_class.__name__}>", "exec"), namespace)
+        return paths, namespace["convert"], relations
+
+    def _path(self, field):
+        if field.field_name in self.sources:
+            return self.sources[field.field_name]
+        unsupported = (*UNSUPPORTED_FIELDS, serializers.BaseSerializer)
+        if isinstance(field, unsupported) or field.source == "*":
+            raise ImproperlyConfigured(
+                f"{self.serializer_class.__name__}.{field.field_name} can't be compiled, "
+                "give its column in sources"
+            )
+        return "__".join(field.source_attrs)
+
+    def _converter(self, field):
+        """The function converting the value of a field, None when unchanged."""
+        if field.field_name in self.sources or isinstance(field, PASSTHROUGH_FIELDS):
+            return None
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            # .values() already gives the id
+            return field.pk_field.to_representation if field.pk_field else None
+        return field.to_representation
+
+    def values(self, queryset, **expressions):
+        """The queryset rows as dicts, with the columns the serializer needs."""
+        paths = self._compiled[0]
+        return queryset.prefetch_related(None).values(*paths, **expressions)
+
+    def serialize(self, rows):
+        """Dicts of the serializer's output for rows of values()."""
+        _, convert, relations = self._compiled
+        rows = list(rows)
+        data = [convert(row) for row in rows]
+        for name, relation in relations.items():
+            self._attach(name, relation, rows, data)
+        return data
+
+    def stream(self, queryset, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the JSON array of the queryset rows piece by piece.
+
+        NOTE: .iterator() reads the rows through a server-side cursor, chunk_size
+        rows at a time, and each chunk is serialized and sent before the next one
+        is read, so memory use doesn't grow with the number of rows.
+        """
+        renderer = ORJSONRenderer()
+        rows = self.values(queryset).iterator(chunk_size=chunk_size)
+        yield b"["
+        separator = b""
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            # The rendered list without its brackets
+            yield separator + renderer.render(self.serialize(chunk))[1:-1]
+            separator = b","
+        yield b"]"
+
+    def _attach(self, name, relation, rows, data):
+        """Fill the nested field `name` of data with the child rows, in one query."""
+        child = self.nested[name]
+        keys = [row[relation.target_field.attname] for row in rows]
+        if not keys:
+            return
+
+        queryset = child.queryset
+        if queryset is None:
+            queryset = relation.model._default_manager.all()
+        if not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        child_rows = list(
+            child.values(
+                queryset.filter(**{f"{relation.name}__in": keys}),
+                **{PARENT_KEY: F(relation.attname)},
+            )
+        )
+
+        children = defaultdict(list)
+        for child_row, child_data in zip(child_rows, child.serialize(child_rows)):
+            children[child_row[PARENT_KEY]].append(child_data)
+        for key, item in zip(keys, data):
+            item[name] = children[key]
+
+
+class CompiledListMixin:
+    """
+    ListModelMixin.list() serializing with compiled_serializer.
+
+    Filtering, ordering and pagination work as before, on the rows of
+    .values() instead of model instances.
+    With ?stream=true the whole list is sent as a streaming JSON array instead,
+    unpaginated, e.g. for exports.
+    """
+
+    compiled_serializer = None
+    stream_query_param = "stream"
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        serializer = self.compiled_serializer
+        if request.query_params.get(self.stream_query_param, "").lower() in ("1", "true"):
+            return StreamingHttpResponse(
+                serializer.stream(
+                    self.filter_queryset(self.get_queryset()), self.stream_chunk_size
+                ),
+                content_type="application/json",
+            )
+
+        queryset = serializer.values(self.filter_queryset(self.get_queryset()))
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer.serialize(page))
+        return Response(serializer.serialize(queryset))
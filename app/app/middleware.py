@@ -0,0 +1,116 @@
+"""
+Project wide middlewares.
+"""
+
+import random
+import time
+from contextlib import ExitStack
+
+from app.db_router import RequestState, current_request, pin_to_primary
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import OperationalError, connections
+from django.urls import Resolver404, resolve
+
+
+class QueryFaultInjector:
+    """
+    Database execute wrapper adding latency and random errors to every query.
+
+    Docs: https://docs.djangoproject.com/en/4.2/topics/db/instrumentation/
+    """
+
+    def __init__(self, query_latency_ms=0, error_rate=0.0):
+        self.query_latency = query_latency_ms / 1000
+        self.error_rate = error_rate
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.query_latency:
+            time.sleep(self.query_latency)
+        if self.error_rate and random.random() < self.error_rate:
+            raise OperationalError("Injected fault (settings.FAULT_INJECTION)")
+        return execute(sql, params, many, context)
+
+
+class FaultInjectionMiddleware:
+    """
+    Inject query latency / database errors into selected views, for load testing.
+
+    Configured with settings.FAULT_INJECTION, off unless ENABLED is True:
+        FAULT_INJECTION = {
+            "ENABLED": True,
+            "VIEWS": {
+                # view class / function name, or URL name ("namespace:name")
+                "ProductListCreateAPIView": {"query_latency_ms": 2000, "error_rate": 0.0},
+            },
+        }
+    Only SQL queries are slowed down, so a response served from cache stays fast.
+    """
+
+    def __init__(self, get_response):
+        config = getattr(settings, "FAULT_INJECTION", {})
+        if not config.get("ENABLED"):
+            # NOTE: Django drops a middleware raising MiddlewareNotUsed at startup,
+            # so when disabled it costs nothing per request
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.rules = config.get("VIEWS", {})
+
+    def __call__(self, request):
+        rule = self._rule_for(request)
+        if rule is None:
+            return self.get_response(request)
+
+        injector = QueryFaultInjector(**rule)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(injector))
+            return self.get_response(request)
+
+    def _rule_for(self, request):
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+
+        # NOTE: as_view() stores the class on the view function:
+        # view_class for generic views, cls for viewsets
+        view_class = getattr(match.func, "view_class", None) or getattr(match.func, "cls", None)
+        names = [match.view_name, match.func.__name__]
+        if view_class is not None:
+            names.append(view_class.__name__)
+
+        for name in names:
+            if name in self.rules:
+                return self.rules[name]
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Give app.db_router.ReplicaRouter the request being served.
+
+    After a request that wrote to the database, the user's reads stay on the
+    primary for REPLICA_ROUTING["STICKY_SECONDS"], so they see their own
+    writes (e.g. the order just created) while the replicas catch up.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REPLICA_ROUTING["ALIASES"]:
+            # Without replicas every query goes to the primary anyway
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = RequestState(request)
+        token = current_request.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            # NOTE: Queries run later, like the body of a streaming response, use the primary
+            current_request.reset(token)
+
+        user = getattr(request, "user", None)
+        if state.wrote and user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
+        return response
@@ -0,0 +1,57 @@
+"""
+Project wide pagination classes.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class OptInCursorPagination(CursorPagination):
+    """
+    Cursor pagination that clients opt in to with ?paginate=true.
+
+    The recipe, tag and ingredient lists used to return every row in a plain list.
+    While clients migrate, that response stays the default; with ?paginate=true
+    (or a cursor from a previous page) the list is paginated:
+        {"next": ..., "previous": ..., "results": [...]}
+    Each page is one index range scan on (user_id, <ordering>) ... LIMIT size.
+    """
+
+    page_size = 50
+    page_size_query_param = "size"
+    max_page_size = 200
+    opt_in_query_param = "paginate"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # NOTE: Returning None makes ListModelMixin render the unpaginated list
+        if not self.is_opted_in(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+    def is_opted_in(self, request):
+        value = request.query_params.get(self.opt_in_query_param, "")
+        return value.lower() in ("1", "true") or self.cursor_query_param in request.query_params
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.append(
+            {
+                "name": self.opt_in_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Set to true to paginate the list.",
+                "schema": {"type": "boolean"},
+            }
+        )
+        return parameters
+
+
+class IdCursorPagination(OptInCursorPagination):
+    """Newest first."""
+
+    ordering = "-id"
+
+
+class NameCursorPagination(OptInCursorPagination):
+    """By name, descending. The id keeps the order stable between equal names."""
+
+    ordering = ("-name", "-id")
@@ -0,0 +1,27 @@
+"""
+Project wide parsers.
+"""
+
+import orjson
+from app.renderers import ORJSONRenderer
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class ORJSONParser(BaseParser):
+    """
+    Parser reading JSON request bodies with orjson.
+
+    Like DRF's JSONParser in strict mode, NaN and Infinity are refused.
+    """
+
+    media_type = "application/json"
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON and return the resulting data."""
+        try:
+            # NOTE: orjson only reads UTF-8, the only encoding allowed for JSON (RFC 8259)
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
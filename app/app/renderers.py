@@ -0,0 +1,74 @@
+"""
+Project wide renderers.
+"""
+
+import math
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# NOTE: Same output as DRF's JSONRenderer (compact, UTF-8), but orjson encodes
+# in C: dict, list, str, int, float, UUID and datetime never reach Python code.
+# OPT_UTC_Z: "...Z" instead of "...+00:00" for UTC, like DRF
+# OPT_NON_STR_KEYS: int keys, lazy translation strings as keys... like json.dumps
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def _has_non_finite_float(data):
+    """Whether data holds a NaN or infinite float, which orjson writes as null."""
+    # NOTE: Only containers go on the stack, and the common scalars are skipped
+    # first: about 20 ms for the 130k values of 10k orders
+    stack = [[data]]
+    while stack:
+        container = stack.pop()
+        values = container.values() if isinstance(container, dict) else container
+        for value in values:
+            cls = type(value)
+            if cls is str or cls is int or value is None:
+                continue
+            if cls is float:
+                if not math.isfinite(value):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                stack.append(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renderer serializing to JSON with orjson.
+
+    Types orjson doesn't know (Decimal, lazy strings, querysets, timedelta...)
+    are converted by DRF's JSONEncoder, as with JSONRenderer.
+    What orjson encodes differently is rendered by JSONRenderer itself:
+    NaN / Infinity (a ValueError with STRICT_JSON, like JSONRenderer, not null)
+    and integers beyond 64 bits.
+    """
+
+    _encoder = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring."""
+        if data is None:
+            return b""
+
+        options = ORJSON_OPTIONS
+        # NOTE: orjson only indents with 2 spaces, used for any requested indent
+        # (e.g. "application/json; indent=4", or the browsable API)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            options |= orjson.OPT_INDENT_2
+
+        try:
+            ret = orjson.dumps(data, default=self._encoder.default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, or a type JSONRenderer fails on too with its own error
+            return super().render(data, accepted_media_type, renderer_context)
+        # NOTE: Only output with a null can hide a NaN, so most responses skip the scan
+        if b"null" in ret and _has_non_finite_float(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like JSONRenderer, escape U+2028 / U+2029 so the output is valid JavaScript
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
@@ -14,6 +14,9 @@ import os
 from datetime import timedelta
 from pathlib import Path
 
+import django
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -39,6 +42,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "core",
     "rest_framework",
     "rest_framework.authtoken",
@@ -63,6 +67,10 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # NOTE: Load testing only, does nothing unless FAULT_INJECTION["ENABLED"] is True
+    "app.middleware.FaultInjectionMiddleware",
+    # Does nothing unless REPLICA_ROUTING["ALIASES"] lists replicas
+    "app.middleware.ReplicaRoutingMiddleware",
 ]
 
 ROOT_URLCONF = "app.urls"
@@ -106,7 +114,59 @@ DATABASES = {
         "NAME": os.environ.get("DB_NAME"),
         "USER": os.environ.get("DB_USER"),
         "PASSWORD": os.environ.get("DB_PASS"),
+        # NOTE: Seconds a connection is reused across requests / Celery tasks
+        # instead of paying a TCP + auth handshake each time. 0 closes it at the
+        # end of each request. Set per deployment in docker-compose.yml.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),
+        # Check a reused connection still works before the first query of a request
+        "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "1") == "1",
+    }
+}
+
+# NOTE: In-process connection pool (Django >= 5.1, requires psycopg[pool], not psycopg2).
+# Connections are returned to the pool at the end of each request, so one
+# process can serve more threads than it has connections. Replaces CONN_MAX_AGE.
+# Benchmark with: python manage.py bench_db_connections
+# Not available with this image: python:3.9 stops at Django 4.2, and
+# requirements.txt installs psycopg2. The persistent connections above are used.
+if os.environ.get("DB_POOL") == "1":
+    if django.VERSION < (5, 1):
+        raise ImproperlyConfigured(
+            "DB_POOL=1 needs Django >= 5.1 (Python >= 3.10) and psycopg[pool] instead of psycopg2"
+        )
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.environ.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.environ.get("DB_POOL_MAX_SIZE", 10)),
+            # Seconds to wait for a free connection before an error
+            "timeout": int(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        }
+    }
+
+
+# NOTE: Read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2
+# Same name and credentials as the primary. Safe-method requests read from
+# them, see app/db_router.py
+DB_REPLICA_HOSTS = [host for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host]
+for index, host in enumerate(DB_REPLICA_HOSTS, start=1):
+    DATABASES[f"replica_{index}"] = {
+        **DATABASES["default"],
+        "HOST": host,
+        # The test database of a replica is the primary one
+        "TEST": {"MIRROR": "default"},
     }
+
+DATABASE_ROUTERS = ["app.db_router.ReplicaRouter"]
+
+REPLICA_ROUTING = {
+    "ALIASES": [f"replica_{index}" for index in range(1, len(DB_REPLICA_HOSTS) + 1)],
+    # Reads of a user stay on the primary this long after the user wrote
+    "STICKY_SECONDS": int(os.environ.get("DB_REPLICA_STICKY_SECONDS", 5)),
+    # A replica further behind is skipped until it catches up
+    "MAX_LAG_SECONDS": float(os.environ.get("DB_REPLICA_MAX_LAG_SECONDS", 2)),
+    # Seconds between two lag checks of a replica, per process
+    "LAG_CHECK_INTERVAL": float(os.environ.get("DB_REPLICA_LAG_CHECK_INTERVAL", 1)),
 }
 
 
@@ -129,6 +189,28 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing, see core/hashers.py
+# The first hasher hashes new passwords, the others only verify existing ones,
+# which are hashed again with the first one at the next login.
+# Size the login tier with: python manage.py bench_logins
+
+PASSWORD_HASHERS = [
+    "core.hashers.Argon2PasswordHasher",
+    "core.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+]
+if os.environ.get("PASSWORD_HASHER") == "pbkdf2":
+    PASSWORD_HASHERS.insert(0, PASSWORD_HASHERS.pop(1))
+
+PASSWORD_HASHING = {
+    # OWASP minimum for Argon2id: 19 MiB, 2 iterations, 1 lane
+    "ARGON2_TIME_COST": int(os.environ.get("ARGON2_TIME_COST", 2)),
+    "ARGON2_MEMORY_COST": int(os.environ.get("ARGON2_MEMORY_COST", 19456)),  # KiB
+    "ARGON2_PARALLELISM": int(os.environ.get("ARGON2_PARALLELISM", 1)),
+    "PBKDF2_ITERATIONS": int(os.environ.get("PBKDF2_ITERATIONS", 600000)),
+}
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
@@ -152,6 +234,11 @@ MEDIA_URL = "/static/media/"
 MEDIA_ROOT = "/vol/web/media"
 STATIC_ROOT = "/vol/web/static"
 
+# NOTE: Largest body accepted by the streaming recipe image upload (recipe/parsers.py)
+RECIPE_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+# NOTE: Seconds between a recipe image losing its last recipe and its deletion
+RECIPE_IMAGE_GC_DELAY = 10 * 60
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -163,12 +250,25 @@ REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.SessionAuthentication",
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "user.authentication.ClaimsJWTAuthentication",
     ],
     "DEFAULT_FILTER_BACKENDS": ["django_filters.rest_framework.DjangoFilterBackend"],
+    # NOTE: orjson instead of the stdlib json module, same output (app/renderers.py)
+    # Benchmark with: python manage.py bench_json_render
+    "DEFAULT_RENDERER_CLASSES": [
+        "app.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "app.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     # NOTE: Globally apply pagination and default size
     # "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     # "PAGE_SIZE": 2,
+    # NOTE: The recipe, tag and ingredient lists set pagination_class per view
+    # (app/pagination.py), opt-in with ?paginate=true while clients migrate
     # NOTE: Throttling
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
@@ -203,7 +303,10 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": False,
     # Whether to blacklist old refresh tokens when a new one is created
     # If True, requires rest_framework_simplejwt.token_blacklist
+    # NOTE: Revocation is done without it, see user.authentication.revoke_tokens
     "BLACKLIST_AFTER_ROTATION": False,
+    # Refuses the refresh tokens of users logged out everywhere
+    "TOKEN_REFRESH_SERIALIZER": "user.serializers.UserTokenRefreshSerializer",
     "ALGORITHM": "HS256",  # Algorithm used to sign the token
     "SIGNING_KEY": SECRET_KEY,  # Key used to sign the token
     "VERIFYING_KEY": None,  # Key used to verify the token signature
@@ -240,5 +343,15 @@ CELERY_TIMEZONE = TIME_ZONE
 # Celery beat settings
 CELERY_BEAT_SCHEDULER = "django_celery_beat.schedulers:DatabaseScheduler"
 
+# Latency / fault injection for load testing, see app/middleware.py
+FAULT_INJECTION = {
+    "ENABLED": os.environ.get("FAULT_INJECTION_ENABLED") == "1",
+    "VIEWS": {
+        # e.g. make every SQL query of the product list take 200ms more,
+        # to measure what a cache hit saves:
+        # "ProductListCreateAPIView": {"query_latency_ms": 200, "error_rate": 0.0},
+    },
+}
+
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"  # For development - prints to console
 DEFAULT_FROM_EMAIL = "noreply@example.com"
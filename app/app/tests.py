@@ -1,6 +1,50 @@
-from django.test import SimpleTestCase
+import datetime
+import io
+import json
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections, transaction
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
 
 from app import calc
+from app.db_router import ReplicaRouter, RequestState, _replica_status, current_request
+from app.fast_serializers import CompiledSerializer
+from app.middleware import FaultInjectionMiddleware, ReplicaRoutingMiddleware
+from app.parsers import ORJSONParser
+from app.renderers import ORJSONRenderer
+from bugbytes.models import Order, OrderItem, Product
+from bugbytes.serializers import (
+    OrderSerializer,
+    ProductSerializer,
+    order_list_serializer,
+    product_list_serializer,
+)
+from ingredient.models import Ingredient
+from ingredient.serializers import IngredientSerializer, ingredient_list_serializer
+from tags.models import Tag
+from tags.serializers import TagSerializer, tag_list_serializer
+from user.authentication import revocation_cache
+from user.models import ClaimsUser
 
 
 # SimpleTestCase: No DB interaction
@@ -19,3 +63,382 @@ class CalcTests(SimpleTestCase):
         res = calc.subtract(10, 3)
 
         self.assertEqual(res, 7)
+
+
+PRODUCTS_URL = "/api/bugbytes/products/"
+SLOW_PRODUCTS = {
+    "ENABLED": True,
+    "VIEWS": {"ProductListCreateAPIView": {"query_latency_ms": 50}},
+}
+
+
+class FaultInjectionMiddlewareTests(TestCase):
+    """Test the load testing fault injection middleware."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_disabled_by_default(self):
+        """Test the middleware is not loaded unless enabled."""
+        with self.assertRaises(MiddlewareNotUsed):
+            FaultInjectionMiddleware(lambda request: None)
+
+    @override_settings(FAULT_INJECTION=SLOW_PRODUCTS)
+    @patch("app.middleware.time.sleep")
+    def test_latency_added_to_queries_of_scoped_view(self, patched_sleep):
+        """Test each query of the configured view is delayed."""
+        client = APIClient()
+
+        client.get(PRODUCTS_URL)
+
+        self.assertTrue(patched_sleep.called)
+        patched_sleep.assert_called_with(0.05)
+
+    @override_settings(FAULT_INJECTION=SLOW_PRODUCTS)
+    @patch("app.middleware.time.sleep")
+    def test_cache_hit_not_delayed(self, patched_sleep):
+        """Test a response served from cache runs no delayed query."""
+        client = APIClient()
+        client.get(PRODUCTS_URL)
+        patched_sleep.reset_mock()
+
+        client.get(PRODUCTS_URL)
+
+        patched_sleep.assert_not_called()
+
+    @override_settings(FAULT_INJECTION=SLOW_PRODUCTS)
+    @patch("app.middleware.time.sleep")
+    def test_other_views_not_delayed(self, patched_sleep):
+        """Test views outside the configuration are untouched."""
+        client = APIClient()
+
+        client.get("/api/bugbytes/products/info/")
+
+        patched_sleep.assert_not_called()
+
+    @override_settings(
+        FAULT_INJECTION={
+            "ENABLED": True,
+            "VIEWS": {"ProductsInfoAPIView": {"error_rate": 1.0}},
+        }
+    )
+    def test_error_injected(self):
+        """Test an error rate of 1 fails every query of the view."""
+        client = APIClient(raise_request_exception=False)
+
+        res = client.get("/api/bugbytes/products/info/")
+
+        self.assertEqual(res.status_code, 500)
+
+
+REPLICA_ROUTING = {
+    "ALIASES": ["replica"],
+    "STICKY_SECONDS": 5,
+    "MAX_LAG_SECONDS": 2,
+    "LAG_CHECK_INTERVAL": 1,
+}
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+@patch("app.db_router.replica_lag", return_value=0)
+class ReplicaRouterTests(TransactionTestCase):
+    """Test reads are sent to replicas, unless they must see the latest writes."""
+
+    # NOTE: Not TestCase, whose transaction around each test would keep every read on the primary
+
+    def setUp(self):
+        cache.clear()
+        _replica_status.clear()
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.user = get_user_model().objects.create_user("user@example.com", "pass123")
+
+    def _read_db(self, request, model=Order):
+        token = current_request.set(RequestState(request))
+        try:
+            return self.router.db_for_read(model)
+        finally:
+            current_request.reset(token)
+
+    def _get(self, user=None):
+        request = self.factory.get("/api/bugbytes/orders/")
+        if user is not None:
+            request.user = user
+        return request
+
+    def test_safe_request_reads_replica(self, patched_lag):
+        """Test a GET request reads from the replica, other requests from the primary."""
+        self.assertEqual(self._read_db(self._get(self.user)), "replica")
+        self.assertEqual(self._read_db(self.factory.post("/api/bugbytes/orders/")), "default")
+        # Outside of a request
+        self.assertEqual(self.router.db_for_read(Order), "default")
+
+    def test_auth_reads_on_primary(self, patched_lag):
+        """Test sessions and users are read from the primary, even in a GET request."""
+        for model in (Session, Permission, get_user_model(), ClaimsUser):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(self._read_db(self._get(), model), "default")
+
+    def test_read_after_write_in_request(self, patched_lag):
+        """Test reads after a write of the same request go to the primary."""
+        token = current_request.set(RequestState(self._get()))
+        try:
+            self.router.db_for_write(Order)
+            self.assertEqual(self.router.db_for_read(Order), "default")
+        finally:
+            current_request.reset(token)
+
+    def test_read_in_transaction(self, patched_lag):
+        """Test reads inside a transaction on the primary stay on the primary."""
+        with transaction.atomic():
+            self.assertEqual(self._read_db(self._get()), "default")
+
+    def test_lagging_replica_skipped(self, patched_lag):
+        """Test a replica behind more than MAX_LAG_SECONDS is not used."""
+        patched_lag.return_value = 10
+
+        self.assertEqual(self._read_db(self._get()), "default")
+
+        # The result is reused until the next check
+        patched_lag.return_value = 0
+        self.assertEqual(self._read_db(self._get()), "default")
+        self.assertEqual(patched_lag.call_count, 1)
+
+    def test_user_reads_own_writes(self, patched_lag):
+        """Test the reads of a user who just wrote go to the primary for a while."""
+
+        def create_order(request):
+            request.user = self.user
+            Order.objects.create(user=self.user)
+            return None
+
+        ReplicaRoutingMiddleware(create_order)(self.factory.post("/api/bugbytes/orders/"))
+
+        self.assertEqual(self._read_db(self._get(self.user)), "default")
+        other = get_user_model().objects.create_user("other@example.com", "pass123")
+        self.assertEqual(self._read_db(self._get(other)), "replica")
+
+    def test_middleware_unused_without_replicas(self, patched_lag):
+        """Test the middleware is not loaded when no replica is configured."""
+        with self.settings(REPLICA_ROUTING={**REPLICA_ROUTING, "ALIASES": []}):
+            with self.assertRaises(MiddlewareNotUsed):
+                ReplicaRoutingMiddleware(lambda request: None)
+
+
+@override_settings(REPLICA_ROUTING=REPLICA_ROUTING)
+@patch("app.db_router.replica_lag", return_value=0)
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Test the middleware, router and views together, with a real replica alias."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # NOTE: A second connection to the test database, like a replica with
+        # TEST: {"MIRROR": "default"}, so the queries sent to it really run.
+        # Added after setUpClass(): the test runner checks the aliases of databases exist
+        connections.settings["replica"] = {
+            **connections["default"].settings_dict,
+            "TEST": {"MIRROR": "default"},
+        }
+        cls.databases = {"default", "replica"}
+
+    @classmethod
+    def tearDownClass(cls):
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        _replica_status.clear()
+        self.client = APIClient()
+        self.admin = get_user_model().objects.create_superuser("admin@example.com", "pass123")
+        Product.objects.create(name="Coffee", price=Decimal("4.50"), stock=3)
+
+    def _get_products(self):
+        """GET the product list, return (response, queries on the primary, on the replica)."""
+        with CaptureQueriesContext(connections["default"]) as primary:
+            with CaptureQueriesContext(connections["replica"]) as replica:
+                res = self.client.get(PRODUCTS_URL)
+        self.assertEqual(res.status_code, 200)
+        return res, primary, replica
+
+    def test_list_read_from_replica(self, patched_lag):
+        """Test an anonymous GET runs its queries on the replica."""
+        res, primary, replica = self._get_products()
+
+        self.assertEqual(res.json()[0]["name"], "Coffee")
+        self.assertEqual(len(primary), 0)
+        self.assertTrue(any("bugbytes_product" in query["sql"] for query in replica))
+
+    def test_session_cookie_get(self, patched_lag):
+        """Test a GET with a session cookie loads the session and user on the primary."""
+        self.client.force_login(self.admin)
+
+        res, primary, replica = self._get_products()
+
+        self.assertEqual(len(res.json()), 1)
+        self.assertTrue(any("django_session" in query["sql"] for query in primary))
+        self.assertFalse(any("django_session" in query["sql"] for query in replica))
+        self.assertTrue(any('"core_user"' in query["sql"] for query in primary))
+        self.assertFalse(any('"core_user"' in query["sql"] for query in replica))
+        self.assertTrue(any("bugbytes_product" in query["sql"] for query in replica))
+
+    def test_token_version_read_on_primary(self, patched_lag):
+        """Test the revocation state of a JWT is read from the primary, never a lagging replica."""
+        res = self.client.post(
+            reverse("user_login"), {"email": "admin@example.com", "password": "pass123"}
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        cache.clear()
+        revocation_cache.clear()
+
+        res, primary, replica = self._get_products()
+
+        self.assertTrue(any('"token_version"' in query["sql"] for query in primary))
+        self.assertFalse(any('"core_user"' in query["sql"] for query in replica))
+
+    def test_user_reads_own_writes(self, patched_lag):
+        """Test the list read right after the user created a product comes from the primary."""
+        self.client.force_login(self.admin)
+        res = self.client.post(PRODUCTS_URL, {"name": "Tea", "price": "3.00", "stock": 5})
+        self.assertEqual(res.status_code, 201)
+
+        res, primary, replica = self._get_products()
+
+        self.assertEqual(len(res.json()), 2)
+        self.assertTrue(any("bugbytes_product" in query["sql"] for query in primary))
+        self.assertFalse(any("bugbytes_product" in query["sql"] for query in replica))
+
+
+class ORJSONTests(SimpleTestCase):
+    """Test the orjson renderer and parser behave like DRF's JSON ones."""
+
+    def test_same_output_as_json_renderer(self):
+        """Test the rendered bytes are the ones of JSONRenderer."""
+        data = {
+            "order_id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "price": Decimal("10.50"),
+            "created_at": datetime.datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            "tokyo": datetime.datetime(
+                2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=9))
+            ),
+            "naive": datetime.datetime(2024, 1, 2, 3, 4, 5),
+            "day": datetime.date(2024, 1, 2),
+            "duration": datetime.timedelta(minutes=90),
+            "label": gettext_lazy("Pending"),
+            "text": "caf\u00e9 \u2028 \u2029",
+            "items": [{"quantity": 2, "ratio": 0.5}, None, True],
+            1: "int key",
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_non_finite_floats_refused(self):
+        """Test NaN and Infinity raise like JSONRenderer instead of rendering as null."""
+        for value in (float("nan"), float("inf"), float("-inf")):
+            data = {"items": [{"f": value}, None]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                ORJSONRenderer().render(data)
+
+        # Not strict: rendered by JSONRenderer, as NaN
+        with patch.object(ORJSONRenderer, "strict", False):
+            self.assertEqual(ORJSONRenderer().render({"f": float("nan")}), b'{"f":NaN}')
+
+    def test_big_integers(self):
+        """Test integers beyond 64 bits are encoded like JSONRenderer does."""
+        data = {"n": 2**64, "m": -(2**70), "items": [2**100]}
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_indent(self):
+        """Test an indent requested in the media type pretty prints the same data."""
+        data = {"items": [1, 2]}
+
+        rendered = ORJSONRenderer().render(data, "application/json; indent=4")
+
+        self.assertIn(b"\n", rendered)
+        self.assertEqual(json.loads(rendered), data)
+
+    def test_parse(self):
+        """Test JSON bodies are parsed, invalid ones refused."""
+        parser = ORJSONParser()
+
+        self.assertEqual(
+            parser.parse(io.BytesIO('{"name": "caf\u00e9", "n": [1.5]}'.encode())),
+            {"name": "caf\u00e9", "n": [1.5]},
+        )
+        for body in (b"{", b"", b'{"n": NaN}'):
+            with self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(body))
+
+
+class CompiledSerializerParityTests(TestCase):
+    """Test compiled serializers give the output of the serializers they come from."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com", "pass123")
+        self.products = [
+            Product.objects.create(
+                name=f"Product {i}", description="", price=Decimal(f"{i}.5"), stock=i
+            )
+            for i in range(1, 4)
+        ]
+
+    def assertSameOutput(self, serializer_class, compiled, queryset):
+        expected = serializer_class(queryset, many=True).data
+        actual = compiled.serialize(compiled.values(queryset))
+
+        self.assertEqual(actual, expected)
+        # Same keys in the same order, same types
+        self.assertEqual(ORJSONRenderer().render(actual), ORJSONRenderer().render(expected))
+
+    def test_products(self):
+        """Test the product list."""
+        self.assertSameOutput(
+            ProductSerializer, product_list_serializer, Product.objects.order_by("pk")
+        )
+
+    def test_orders(self):
+        """Test the order list, nested items and totals included."""
+        for status_, items in (("Pending", 2), ("Confirmed", 0), ("Cancelled", 3)):
+            order = Order.objects.create(user=self.user, status=status_)
+            for product in self.products[:items]:
+                OrderItem.objects.create(order=order, product=product, quantity=product.stock)
+
+        self.assertSameOutput(
+            OrderSerializer,
+            order_list_serializer,
+            Order.objects.with_totals().order_by("-created_at", "-order_id"),
+        )
+
+    def test_tags_and_ingredients(self):
+        """Test the tag and ingredient lists."""
+        for name in ("Vegan", "Dessert"):
+            Tag.objects.create(user=self.user, name=name)
+            Ingredient.objects.create(user=self.user, name=name)
+
+        self.assertSameOutput(TagSerializer, tag_list_serializer, Tag.objects.order_by("-name"))
+        self.assertSameOutput(
+            IngredientSerializer, ingredient_list_serializer, Ingredient.objects.order_by("-name")
+        )
+
+    def test_method_field_needs_source(self):
+        """Test a field computed in Python can't be compiled without its column."""
+
+        class NameLengthSerializer(serializers.ModelSerializer):
+            length = serializers.SerializerMethodField()
+
+            def get_length(self, obj):
+                return len(obj.name)
+
+            class Meta:
+                model = Tag
+                fields = ["id", "length"]
+
+        with self.assertRaises(ImproperlyConfigured):
+            CompiledSerializer(NameLengthSerializer).values(Tag.objects.all())
@@ -0,0 +1,137 @@
+"""
+Cache helpers for the bugbytes API.
+"""
+
+import hashlib
+import time
+from functools import wraps
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PRODUCT_LIST_NAMESPACE = "product_list"
+
+
+def _generation_key(namespace):
+    return f"{namespace}:generation"
+
+
+def _seed_generation():
+    # NOTE: Seeding from the clock (instead of 1) means a generation key that was
+    # evicted never comes back with a number that old, still-live entries use.
+    return int(time.time() * 1000)
+
+
+def get_generation(namespace):
+    """Return the current cache generation for a namespace."""
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        # NOTE: add() only writes if the key is missing, so concurrent
+        # readers agree on the same seed
+        cache.add(key, _seed_generation(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(namespace):
+    """
+    Invalidate every cached entry of a namespace in O(1).
+
+    The generation is part of the cache key, so incrementing it makes all
+    existing entries unreachable; they are left to expire on their own timeout.
+    """
+    key = _generation_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Key missing (never read or evicted): a fresh seed is always newer
+        cache.add(key, _seed_generation(), timeout=None)
+        return cache.incr(key)
+
+
+def normalize_query_params(query_params):
+    """
+    Return a canonical string for a QueryDict.
+
+    Parameter order and blank values don't change the result, so
+    ?ordering=price&search=  and  ?ordering=price  share one cache entry.
+    """
+    items = []
+    for key in sorted(query_params.keys()):
+        values = sorted(value for value in query_params.getlist(key) if value != "")
+        items.extend((key, value) for value in values)
+    return urlencode(items)
+
+
+def _cache_tier(request, vary_on_user):
+    if callable(vary_on_user):
+        vary_on_user = vary_on_user(request)
+    if vary_on_user and request.user.is_authenticated:
+        # NOTE: Keyed on the user id, not the Authorization header,
+        # so refreshing a token does not start a new cold copy
+        return f"user:{request.user.pk}"
+    return "shared"
+
+
+def cache_response(timeout, namespace, vary_on_user=False):
+    """
+    Cache successful GET responses of a DRF view method.
+
+    The key is built from the namespace generation, the negotiated media type,
+    a cache tier and the normalized query string:
+      - "shared": one copy for everybody (default)
+      - "user:<id>": one copy per authenticated user, only when vary_on_user
+        is True or a callable returning True for the request
+    HTML responses (browsable API) are never cached: they show the user,
+    their CSRF token and the forms they are allowed to use.
+    The body is stored with its headers (Content-Type, Vary, Allow, Link...).
+
+    Usage on class based views:
+        @method_decorator(cache_response(60 * 15, PRODUCT_LIST_NAMESPACE))
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            is_html = request.accepted_renderer.media_type == "text/html"
+            if request.method not in ("GET", "HEAD") or is_html:
+                return view_func(request, *args, **kwargs)
+
+            digest = hashlib.md5(
+                normalize_query_params(request.query_params).encode()
+            ).hexdigest()
+            key = ":".join(
+                [
+                    namespace,
+                    str(get_generation(namespace)),
+                    request.accepted_media_type,
+                    _cache_tier(request, vary_on_user),
+                    digest,
+                ]
+            )
+
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                return HttpResponse(content, headers=headers)
+
+            response = view_func(request, *args, **kwargs)
+            # NOTE: A streaming response has no body to store, it is produced while sent
+            if response.status_code == 200 and not response.streaming:
+
+                def _store(rendered):
+                    cache.set(key, (rendered.content, dict(rendered.items())), timeout)
+
+                # NOTE: DRF responses are rendered after the view returns,
+                # so the body can only be stored once rendering happened
+                if getattr(response, "is_rendered", True):
+                    _store(response)
+                else:
+                    response.add_post_render_callback(_store)
+            return response
+
+        return _wrapped_view
+
+    return decorator
@@ -1,4 +1,10 @@
+from datetime import datetime, time, timedelta
+
 import django_filters
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connections
+from django.utils import timezone
+from django_filters.constants import EMPTY_VALUES
 from .models import Product, Order
 from rest_framework import filters
 
@@ -15,11 +21,57 @@ class ProductFilter(django_filters.FilterSet):
             'price': ['exact', 'lt', 'gt', 'range']
         }
 
+
+class SargableDateFilter(django_filters.DateFilter):
+    """
+    Filter a DateTimeField on a calendar day of the current time zone.
+
+    field__date = day wraps the column in a date cast, so no index on the
+    column can be used. This filter sends a half-open range instead:
+        field >= day 00:00 AND field < next day 00:00
+    with both bounds made aware in the current time zone (DST safe).
+    """
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(value, time.min), tz)
+        end = timezone.make_aware(datetime.combine(value + timedelta(days=1), time.min), tz)
+        qs = qs.filter(**{
+            f'{self.field_name}__gte': start,
+            f'{self.field_name}__lt': end,
+        })
+        return qs.distinct() if self.distinct else qs
+
+
 class OrderFilter(django_filters.FilterSet):
-    created_at = django_filters.DateFilter(field_name='created_at__date')
+    # NOTE: ?created_at=YYYY-MM-DD matches the whole day as an index-friendly range
+    created_at = SargableDateFilter(field_name='created_at')
     class Meta:
         model = Order
         fields = {
             'status': ['exact'],
             'created_at': ['lt', 'gt', 'exact']
-        }
\ No newline at end of file
+        }
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that ranks matches by trigram similarity on Postgres.
+
+    Matching is unchanged (same ?search= semantics and search_fields) and is
+    served by the trigram indexes on Product. Results are ordered by how
+    close name and description are to the search terms; an explicit
+    ?ordering= (OrderingFilter runs after this backend) still wins.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = super().filter_queryset(request, queryset, view)
+        search_terms = self.get_search_terms(request)
+        if not search_terms or connections[queryset.db].vendor != 'postgresql':
+            return queryset
+
+        search = ' '.join(search_terms)
+        rank = TrigramWordSimilarity(search, 'name') + TrigramWordSimilarity(search, 'description')
+        return queryset.annotate(search_rank=rank).order_by('-search_rank', 'pk')
@@ -0,0 +1,99 @@
+"""
+Django command to benchmark the compiled list serializers against the DRF serializers.
+
+Usage:
+    python manage.py bench_fast_serializers --sizes 1000 10000 100000
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from bugbytes.models import Order, OrderItem, Product
+from bugbytes.serializers import (
+    OrderSerializer,
+    ProductSerializer,
+    order_list_serializer,
+    product_list_serializer,
+)
+
+BENCH_EMAIL = "bench_fast_serializers@example.com"
+SEED_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    """Time serializing the first N products / orders, query included."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000])
+        parser.add_argument("--items-per-order", type=int, default=2)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        sizes = options["sizes"]
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        products = []
+        try:
+            self.stdout.write(f"Seeding {max(sizes)} products and orders...")
+            for start in range(0, max(sizes), SEED_BATCH_SIZE):
+                count = min(SEED_BATCH_SIZE, max(sizes) - start)
+                products += Product.objects.bulk_create(
+                    Product(name=f"bench {start + i}", description="", price=Decimal("2.50"), stock=5)
+                    for i in range(count)
+                )
+                orders = Order.objects.bulk_create(Order(user=user) for _ in range(count))
+                OrderItem.objects.bulk_create(
+                    OrderItem(order=order, product=products[i % len(products)], quantity=2)
+                    for order in orders
+                    for i in range(options["items_per_order"])
+                )
+
+            self.stdout.write(
+                f"{'list':<10} {'rows':>7} {'drf ms':>9} {'compiled ms':>12} {'speedup':>8}"
+            )
+            for size in sizes:
+                # NOTE: The rows are picked outside the timer, both sides then run the same query
+                products_page = Product.objects.filter(
+                    pk__gte=products[0].pk, pk__lte=products[size - 1].pk
+                ).order_by("pk")
+                order_ids = list(
+                    Order.objects.filter(user=user)
+                    .order_by("-created_at", "-order_id")
+                    .values_list("pk", flat=True)[:size]
+                )
+                orders_page = (
+                    Order.objects.with_totals()
+                    .filter(pk__in=order_ids)
+                    .order_by("-created_at", "-order_id")
+                )
+                for label, queryset, serializer_class, compiled in (
+                    ("products", products_page, ProductSerializer, product_list_serializer),
+                    ("orders", orders_page, OrderSerializer, order_list_serializer),
+                ):
+                    drf_ms = self._time(lambda: serializer_class(queryset, many=True).data)
+                    compiled_ms = self._time(
+                        lambda: compiled.serialize(compiled.values(queryset))
+                    )
+                    self.stdout.write(
+                        f"{label:<10} {size:>7} {drf_ms:>9.1f} {compiled_ms:>12.1f} "
+                        f"{drf_ms / compiled_ms:>7.1f}x"
+                    )
+        finally:
+            # NOTE: _raw_delete skips the collector, which would load every order and item
+            OrderItem.objects.filter(order__user=user)._raw_delete(using=connection.alias)
+            Order.objects.filter(user=user)._raw_delete(using=connection.alias)
+            Product.objects.filter(pk__in=[p.pk for p in products])._raw_delete(
+                using=connection.alias
+            )
+            user.delete()
+
+    def _time(self, func):
+        """Duration of func() in ms."""
+        start = time.perf_counter()
+        func()
+        return (time.perf_counter() - start) * 1000
@@ -0,0 +1,102 @@
+"""
+Django command to benchmark rendering and parsing order lists, stdlib json against orjson.
+
+Usage:
+    python manage.py bench_json_render --orders 10000 --items-per-order 3
+"""
+
+import io
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from app.parsers import ORJSONParser
+from app.renderers import ORJSONRenderer
+from bugbytes.models import Order, OrderItem, Product
+from bugbytes.serializers import OrderSerializer
+
+BENCH_EMAIL = "bench_json_render@example.com"
+
+
+class Command(BaseCommand):
+    """Compare render / parse time and memory allocated for an OrderViewSet.list payload."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--orders", type=int, default=10000)
+        parser.add_argument("--items-per-order", type=int, default=3)
+        parser.add_argument("--repeat", type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        products = Product.objects.bulk_create(
+            Product(name=f"bench {i}", description="", price=Decimal("1.50"), stock=100)
+            for i in range(options["items_per_order"])
+        )
+        try:
+            orders = Order.objects.bulk_create(Order(user=user) for _ in range(options["orders"]))
+            OrderItem.objects.bulk_create(
+                OrderItem(order=order, product=product, quantity=2)
+                for order in orders
+                for product in products
+            )
+            queryset = Order.objects.with_totals().filter(user=user)
+            payloads = [
+                # What OrderViewSet.list renders: strings from the serializer fields
+                ("serializer", OrderSerializer(queryset, many=True).data),
+                # Raw UUID / datetime / Decimal values, e.g. from .values()
+                (
+                    "values()",
+                    list(queryset.values("order_id", "created_at", "status", "annotated_total")),
+                ),
+            ]
+
+            self.stdout.write(
+                f"{'payload':<11} {'renderer':<8} {'render ms':>10} {'alloc MiB':>10} "
+                f"{'size MiB':>9} {'parse ms':>9}"
+            )
+            for label, data in payloads:
+                for name, renderer, parser in (
+                    ("json", JSONRenderer(), JSONParser()),
+                    ("orjson", ORJSONRenderer(), ORJSONParser()),
+                ):
+                    self._bench(label, name, renderer, parser, data, options["repeat"])
+        finally:
+            # NOTE: _raw_delete skips the collector, which would load every order and item
+            OrderItem.objects.filter(order__user=user)._raw_delete(using=connection.alias)
+            Order.objects.filter(user=user)._raw_delete(using=connection.alias)
+            user.delete()
+            Product.objects.filter(pk__in=[p.pk for p in products]).delete()
+
+    def _bench(self, label, name, renderer, parser, data, repeat):
+        render = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = renderer.render(data)
+            render.append((time.perf_counter() - start) * 1000)
+
+        # Peak of the memory allocated while rendering, output included
+        tracemalloc.start()
+        renderer.render(data)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        parse = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser.parse(io.BytesIO(body))
+            parse.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(
+            f"{label:<11} {name:<8} {statistics.median(render):>10.1f} "
+            f"{peak / 2**20:>10.1f} {len(body) / 2**20:>9.2f} {statistics.median(parse):>9.1f}"
+        )
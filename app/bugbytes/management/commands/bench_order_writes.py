@@ -0,0 +1,92 @@
+"""
+Django command to benchmark order creation and update by number of order lines.
+
+Usage:
+    python manage.py bench_order_writes --sizes 1 10 100 1000
+"""
+
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from bugbytes.models import Order, OrderItem, Product
+from bugbytes.serializers import OrderCreateSerializer
+
+BENCH_EMAIL = "bench_order_writes@example.com"
+
+
+def legacy_create(user, items):
+    """The previous implementation: one INSERT per order line."""
+    with transaction.atomic():
+        order = Order.objects.create(user=user)
+        for item in items:
+            OrderItem.objects.create(order=order, **item)
+    return order
+
+
+class Command(BaseCommand):
+    """Time OrderCreateSerializer create/update for several order sizes."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[1, 10, 100, 1000],
+            help="Number of lines per order.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        sizes = options["sizes"]
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        products = Product.objects.bulk_create(
+            Product(name=f"bench {i}", description="", price=Decimal("1.00"), stock=10**6)
+            for i in range(max(sizes))
+        )
+        try:
+            self.stdout.write(
+                f"{'lines':>6} {'legacy ms':>10} {'create ms':>10} {'queries':>8} "
+                f"{'update ms':>10} {'queries':>8}"
+            )
+            for size in sizes:
+                self.stdout.write(self._run(user, products[:size]))
+        finally:
+            user.delete()
+            Product.objects.filter(pk__in=[p.pk for p in products]).delete()
+
+    def _run(self, user, products):
+        items = [{"product": product, "quantity": 1} for product in products]
+        legacy_ms, _ = self._time(lambda: legacy_create(user, items))
+
+        payload = {"items": [{"product": p.pk, "quantity": 1} for p in products]}
+        serializer = OrderCreateSerializer(data=payload)
+        serializer.is_valid(raise_exception=True)
+        create_ms, create_queries = self._time(lambda: serializer.save(user=user))
+
+        # Change every other line, the rest stays as is
+        payload["items"] = [
+            {"product": p.pk, "quantity": 1 + i % 2} for i, p in enumerate(products)
+        ]
+        serializer = OrderCreateSerializer(serializer.instance, data=payload)
+        serializer.is_valid(raise_exception=True)
+        update_ms, update_queries = self._time(serializer.save)
+
+        return (
+            f"{len(products):>6} {legacy_ms:>10.2f} {create_ms:>10.2f} "
+            f"{create_queries:>8} {update_ms:>10.2f} {update_queries:>8}"
+        )
+
+    def _time(self, func):
+        """Return the duration in ms and the number of queries of func()."""
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, len(queries)
@@ -0,0 +1,92 @@
+"""
+Django command to benchmark product write latency against the size of the product list cache.
+
+Usage:
+    python manage.py bench_product_cache --sizes 10 1000 100000
+"""
+
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+from bugbytes.cache import PRODUCT_LIST_NAMESPACE
+from bugbytes.models import Product
+
+FILL_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Measure Product.save() latency as the number of cached list variants grows."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            nargs="+",
+            type=int,
+            default=[10, 100, 1000, 10000, 100000],
+            help="Number of cached product list variants to fill before measuring.",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Number of product saves measured per size.",
+        )
+        parser.add_argument(
+            "--legacy",
+            action="store_true",
+            help="Also time the old delete_pattern() invalidation (django-redis only).",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        product = Product.objects.create(
+            name="bench product",
+            description="bench_product_cache",
+            price=Decimal("1.00"),
+            stock=1,
+        )
+        filled = []
+        try:
+            self.stdout.write(f"{'variants':>10} {'save p50 ms':>12} {'save max ms':>12}")
+            for size in options["sizes"]:
+                filled = self._fill(size)
+                timings = self._time_saves(product, options["repeat"])
+                self.stdout.write(
+                    f"{size:>10} {statistics.median(timings):>12.3f} {max(timings):>12.3f}"
+                )
+                if options["legacy"] and hasattr(cache, "delete_pattern"):
+                    start = time.perf_counter()
+                    cache.delete_pattern(f"*{PRODUCT_LIST_NAMESPACE}:bench*")
+                    elapsed = (time.perf_counter() - start) * 1000
+                    self.stdout.write(f"{'':>10} legacy delete_pattern: {elapsed:.3f} ms")
+                cache.delete_many(filled)
+                filled = []
+        finally:
+            cache.delete_many(filled)
+            product.delete()
+
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def _fill(self, size):
+        """Write `size` fake cached list responses and return their keys."""
+        keys = [f"{PRODUCT_LIST_NAMESPACE}:bench:{i}" for i in range(size)]
+        for start in range(0, size, FILL_BATCH_SIZE):
+            batch = keys[start:start + FILL_BATCH_SIZE]
+            cache.set_many({key: b"[]" for key in batch}, timeout=60 * 15)
+        return keys
+
+    def _time_saves(self, product, repeat):
+        """Return the duration in ms of each save, signal handlers included."""
+        timings = []
+        for i in range(repeat):
+            product.stock = i + 1
+            start = time.perf_counter()
+            product.save(update_fields=["stock"])
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
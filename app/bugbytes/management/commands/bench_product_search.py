@@ -0,0 +1,120 @@
+"""
+Django command to benchmark product search with and without the trigram indexes.
+
+Usage:
+    python manage.py bench_product_search --rows 1000000 --queries 200
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from rest_framework import filters
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from bugbytes.filters import ProductSearchFilter
+from bugbytes.models import Product
+from bugbytes.views import ProductListCreateAPIView
+
+SEED_BATCH_SIZE = 10000
+SEED_DESCRIPTION_TAG = "bench_product_search"
+WORDS = (
+    "apple banana cherry mango lemon orange grape melon peach pear plum kiwi "
+    "fresh organic dried frozen juice snack bar chocolate vanilla honey spicy "
+    "sweet sour crunchy creamy roasted salted smoked tropical classic premium"
+).split()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Command(BaseCommand):
+    """Compare p50/p99 of ?search= and ?name__icontains= with and without index scans."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if connection.vendor != "postgresql":
+            raise CommandError("This benchmark needs Postgres (pg_trgm).")
+
+        rng = random.Random(options["seed"])
+        self._seed(rng, options["rows"])
+        terms = [rng.choice(WORDS)[: rng.randint(3, 6)] for _ in range(options["queries"])]
+        try:
+            self.stdout.write(f"{'case':<42} {'p50 ms':>8} {'p99 ms':>8}")
+            for label, backend in (
+                ("search, SearchFilter", filters.SearchFilter),
+                ("search, ProductSearchFilter (ranked)", ProductSearchFilter),
+            ):
+                for indexes in (False, True):
+                    timings = self._run(terms, indexes, self._search_query(backend))
+                    self._report(f"{label} {'idx' if indexes else 'seq'}", timings)
+            for indexes in (False, True):
+                timings = self._run(terms, indexes, self._icontains_query)
+                self._report(f"name__icontains {'idx' if indexes else 'seq'}", timings)
+        finally:
+            # NOTE: _raw_delete skips per-row signals (one cache bump per product)
+            Product.objects.filter(
+                description__endswith=SEED_DESCRIPTION_TAG
+            )._raw_delete(using=connection.alias)
+
+    def _seed(self, rng, rows):
+        self.stdout.write(f"Seeding {rows} products...")
+        for start in range(0, rows, SEED_BATCH_SIZE):
+            Product.objects.bulk_create(
+                Product(
+                    name=" ".join(rng.sample(WORDS, 2)),
+                    description=" ".join(rng.sample(WORDS, 8)) + f" {SEED_DESCRIPTION_TAG}",
+                    price=Decimal("1.00"),
+                    stock=1,
+                )
+                for _ in range(start, min(start + SEED_BATCH_SIZE, rows))
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Product._meta.db_table}")
+
+    def _search_query(self, backend):
+        view = ProductListCreateAPIView()
+        factory = APIRequestFactory()
+
+        def query(term):
+            request = Request(factory.get("/", {"search": term}))
+            return backend().filter_queryset(request, Product.objects.all(), view)
+
+        return query
+
+    def _icontains_query(self, term):
+        return Product.objects.filter(name__icontains=term)
+
+    def _run(self, terms, indexes, build_query):
+        """Time the first page of each query, optionally with index scans disabled."""
+        timings = []
+        for term in terms:
+            with transaction.atomic():
+                if not indexes:
+                    # NOTE: Emulates the schema without the trigram indexes
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET LOCAL enable_bitmapscan = off")
+                        cursor.execute("SET LOCAL enable_indexscan = off")
+                start = time.perf_counter()
+                list(build_query(term)[:50])
+                timings.append((time.perf_counter() - start) * 1000)
+        return timings
+
+    def _report(self, label, timings):
+        self.stdout.write(
+            f"{label:<42} {statistics.median(timings):>8.2f} {percentile(timings, 99):>8.2f}"
+        )
@@ -0,0 +1,105 @@
+"""
+Django command to compare the legacy and the aggregate products info computation.
+
+Usage:
+    python manage.py bench_products_info --rows 1000000
+"""
+
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory
+
+from bugbytes.models import Product
+from bugbytes.serializers import ProductsInfoSerializer
+from bugbytes.views import ProductsInfoAPIView
+
+SEED_BATCH_SIZE = 10000
+SEED_DESCRIPTION = "bench_products_info"
+
+
+def legacy_products_info():
+    """The previous implementation: whole table in memory, three queries."""
+    products = Product.objects.all()
+    return ProductsInfoSerializer(
+        {
+            "products": products,
+            "count": len(products),
+            "max_price": products.aggregate(max_price=Max("price"))["max_price"],
+            "min_price": products.aggregate(min_price=Min("price"))["min_price"],
+            "next": None,
+            "previous": None,
+        }
+    ).data
+
+
+def aggregate_products_info():
+    """The current view, first page only."""
+    request = APIRequestFactory().get(
+        "/api/bugbytes/products/info/", SERVER_NAME="localhost"
+    )
+    response = ProductsInfoAPIView.as_view()(request)
+    return response.data
+
+
+class Command(BaseCommand):
+    """Measure queries, time and peak Python memory of the products info endpoint."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1000000,
+            help="Number of products to seed before measuring.",
+        )
+        parser.add_argument(
+            "--skip-legacy",
+            action="store_true",
+            help="Only measure the aggregate implementation.",
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self._seed(options["rows"])
+        try:
+            if not options["skip_legacy"]:
+                self._measure("legacy", legacy_products_info)
+            self._measure("aggregate", aggregate_products_info)
+        finally:
+            # NOTE: _raw_delete skips per-row signals (one cache bump per product)
+            Product.objects.filter(description=SEED_DESCRIPTION)._raw_delete(
+                using=connection.alias
+            )
+
+    def _seed(self, rows):
+        self.stdout.write(f"Seeding {rows} products...")
+        for start in range(0, rows, SEED_BATCH_SIZE):
+            Product.objects.bulk_create(
+                Product(
+                    name=f"bench {i}",
+                    description=SEED_DESCRIPTION,
+                    price=Decimal(i % 1000 + 1),
+                    stock=1,
+                )
+                for i in range(start, min(start + SEED_BATCH_SIZE, rows))
+            )
+
+    def _measure(self, label, func):
+        tracemalloc.start()
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.stdout.write(
+            f"{label:>10}: {len(queries):>3} queries, "
+            f"{elapsed * 1000:>10.1f} ms, peak {peak / 1024 / 1024:>8.1f} MiB"
+        )
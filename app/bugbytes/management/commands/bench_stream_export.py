@@ -0,0 +1,82 @@
+"""
+Django command to benchmark the peak memory of a full product list, built in memory or streamed.
+
+Usage:
+    python manage.py bench_stream_export --sizes 10000 50000 100000
+"""
+
+import time
+import tracemalloc
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from bugbytes.models import Product
+from bugbytes.views import ProductListCreateAPIView
+
+SEED_BATCH_SIZE = 10000
+BENCH_PREFIX = "bench_stream_export"
+
+
+class Command(BaseCommand):
+    """Peak memory and duration of GET /products/ with and without ?stream=true."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 50000, 100000])
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        view = ProductListCreateAPIView.as_view()
+        factory = APIRequestFactory()
+        seeded = 0
+        try:
+            self.stdout.write(f"{'rows':>7} {'mode':<8} {'peak MiB':>9} {'ms':>8} {'MiB sent':>9}")
+            # NOTE: Without the response cache, which would keep a copy of the list
+            with override_settings(
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+            ):
+                for size in sorted(options["sizes"]):
+                    while seeded < size:
+                        count = min(SEED_BATCH_SIZE, size - seeded)
+                        Product.objects.bulk_create(
+                            Product(
+                                name=f"{BENCH_PREFIX} {seeded + i}",
+                                description="",
+                                price=Decimal("2.50"),
+                                stock=5,
+                            )
+                            for i in range(count)
+                        )
+                        seeded += count
+                    for mode, params in (("list", {}), ("stream", {"stream": "true"})):
+                        request = factory.get("/api/bugbytes/products/", params)
+                        self._bench(size, mode, lambda: view(request))
+        finally:
+            Product.objects.filter(name__startswith=BENCH_PREFIX)._raw_delete(
+                using=connection.alias
+            )
+
+    def _bench(self, size, mode, get):
+        tracemalloc.start()
+        start = time.perf_counter()
+        response = get()
+        sent = 0
+        # What the server does with the response: render it, or iterate the stream
+        if response.streaming:
+            for part in response.streaming_content:
+                sent += len(part)
+        else:
+            sent = len(response.render().content)
+        elapsed = (time.perf_counter() - start) * 1000
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        response.close()
+
+        self.stdout.write(
+            f"{size:>7} {mode:<8} {peak / 2**20:>9.1f} {elapsed:>8.0f} {sent / 2**20:>9.2f}"
+        )
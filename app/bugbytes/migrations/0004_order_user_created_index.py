@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bugbytes', '0003_product_trigram_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at', 'order_id'], name='order_user_created_idx'),
+        ),
+    ]
@@ -1,7 +1,13 @@
 import uuid
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce, Upper
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.conf import settings
 
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField()
@@ -16,8 +22,51 @@ class Product(models.Model):
     
     def __str__(self):
         return self.name
+
+    class Meta:
+        # NOTE: On Postgres, name__icontains / SearchFilter become UPPER("name") LIKE UPPER('%term%'),
+        # which a regular B-tree index can't serve. A trigram (pg_trgm) GIN index on the same
+        # UPPER() expression can, for LIKE with leading wildcards.
+        # Equality (name__iexact, the "=name" search field) is UPPER("name") = UPPER('term'):
+        # gin_trgm_ops only supports = from pg_trgm 1.6 (Postgres 14), docker-compose runs
+        # Postgres 13, so a B-tree index on the same expression serves it. SearchFilter ORs
+        # both lookups, which Postgres then combines with a BitmapOr of the two indexes.
+        indexes = [
+            GinIndex(OpClass(Upper('name'), name='gin_trgm_ops'), name='product_name_trgm_idx'),
+            GinIndex(OpClass(Upper('description'), name='gin_trgm_ops'), name='product_desc_trgm_idx'),
+            models.Index(Upper('name'), name='product_name_upper_idx'),
+        ]
     
 
+def _subtotal_expression(prefix=""):
+    """quantity * product price, computed by the database."""
+    return ExpressionWrapper(
+        F(f"{prefix}quantity") * F(f"{prefix}product__price"),
+        output_field=DecimalField(max_digits=20, decimal_places=2),
+    )
+
+
+# NOTE: A custom QuerySet keeps reusable query logic next to the model,
+# Order.objects.with_totals() is then available everywhere
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate orders with `annotated_total` and prefetch their items
+        annotated with `annotated_subtotal`, both computed in SQL:
+        SUM(order_item.quantity * product.price) ... GROUP BY order.order_id
+        """
+        items = OrderItem.objects.select_related("product").annotate(
+            annotated_subtotal=_subtotal_expression()
+        )
+        return self.prefetch_related(Prefetch("items", queryset=items)).annotate(
+            annotated_total=Coalesce(
+                Sum(_subtotal_expression("items__")),
+                Value(Decimal("0")),
+                output_field=DecimalField(max_digits=20, decimal_places=2),
+            )
+        )
+
+
 class Order(models.Model):
     # NOTE: models.TextChoices acts as ENUM
     class StatusChoices(models.TextChoices):
@@ -41,6 +90,18 @@ class Order(models.Model):
     # Here allows access all orders that contain a specific product by using product.orders.all().
     products = models.ManyToManyField(Product, through="OrderItem", related_name='orders')
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # NOTE: Supports the keyset pagination in pagination.py -> OrderCursorPagination,
+            # B-tree indexes can be scanned in both directions
+            models.Index(fields=['created_at', 'order_id'], name='order_created_keyset_idx'),
+            # NOTE: Non-staff users only ever see their own orders: WHERE user_id = ? AND created_at ...
+            # order_id at the end also serves the keyset pagination of a user's orders
+            models.Index(fields=['user', 'created_at', 'order_id'], name='order_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Order {self.order_id }"
 
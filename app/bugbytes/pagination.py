@@ -0,0 +1,126 @@
+"""
+Pagination classes for the bugbytes API.
+"""
+
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class ProductsInfoPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that can reuse a count computed elsewhere.
+
+    LimitOffsetPagination normally runs its own COUNT(*) query.
+    ProductsInfoAPIView already gets the count from its aggregate() call,
+    so passing it in saves that query.
+    """
+
+    default_limit = 100
+    max_limit = 1000
+
+    def paginate_queryset(self, queryset, request, view=None, count=None):
+        if count is None:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.count = count
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return list(queryset[self.offset:self.offset + self.limit])
+
+
+class OrderCursorPagination(CursorPagination):
+    """
+    Keyset (cursor) pagination on (created_at, order_id), newest first.
+
+    DRF's CursorPagination positions the cursor on the first ordering field
+    only and falls back to OFFSET for rows sharing a timestamp. Here the
+    cursor holds both values, so every position is unique and each page is
+    one index range scan:
+        WHERE (created_at, order_id) < (:created_at, :order_id)
+        ORDER BY created_at DESC, order_id DESC LIMIT :size
+    which costs the same for page N as for page 1.
+    """
+
+    page_size = 20
+    page_size_query_param = "size"
+    max_page_size = 100
+    ordering = ("-created_at", "-order_id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            _, reverse, current_position = self.cursor
+
+        # NOTE: A reverse cursor (previous page) walks the index the other way
+        if reverse:
+            queryset = queryset.order_by("created_at", "order_id")
+        else:
+            queryset = queryset.order_by("-created_at", "-order_id")
+        if current_position is not None:
+            queryset = queryset.filter(
+                self._keyset_filter(current_position, after=reverse)
+            )
+
+        # One extra row tells whether another page follows
+        results = list(queryset[: self.page_size + 1])
+        self.page = results[: self.page_size]
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        else:
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+
+        return self.page
+
+    def _get_position_from_instance(self, instance, ordering):
+        # Rows of .values() are dicts (see app/fast_serializers.py)
+        if isinstance(instance, dict):
+            return f"{instance['created_at'].isoformat()}|{instance['order_id']}"
+        return f"{instance.created_at.isoformat()}|{instance.order_id}"
+
+    def _keyset_filter(self, position, after):
+        """Rows strictly before (or after) a position, in (created_at, order_id) order."""
+        try:
+            created_at, order_id = position.split("|")
+            created_at = datetime.fromisoformat(created_at)
+            order_id = uuid.UUID(order_id)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+        # NOTE: Same as the row comparison (created_at, order_id) < (a, b), written so that
+        # "created_at <= a" can be used as the index range bound
+        if after:
+            return Q(created_at__gte=created_at) & (
+                Q(created_at__gt=created_at) | Q(order_id__gt=order_id)
+            )
+        return Q(created_at__lte=created_at) & (
+            Q(created_at__lt=created_at) | Q(order_id__lt=order_id)
+        )
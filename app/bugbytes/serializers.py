@@ -1,8 +1,79 @@
+from collections import Counter
+
+from app.fast_serializers import CompiledSerializer
 from rest_framework import serializers
-from .models import Product, Order, OrderItem
+from .cache import PRODUCT_LIST_NAMESPACE, bump_generation
+from .models import Product, Order, OrderItem, _subtotal_expression
 from django.db import transaction
+from django.db.models import Case, F, When
+
+# Number of order lines sent per INSERT/UPDATE statement
+ORDER_ITEM_BATCH_SIZE = 500
+
+
+def reserve_stock(quantities):
+    """
+    Take (positive) or give back (negative) stock for {product_id: quantity}.
+
+    Must run inside transaction.atomic(). Raises a ValidationError listing
+    every product without enough stock, in which case nothing is changed.
+    """
+    quantities = {pk: quantity for pk, quantity in quantities.items() if quantity}
+    if not quantities:
+        return
+
+    # NOTE: select_for_update() locks the product rows until the transaction ends,
+    # so concurrent checkouts of the same product wait for each other instead of overselling.
+    # Locking always in product id order means two transactions never wait on each other
+    # in a cycle, which is what a deadlock is.
+    stock = dict(
+        Product.objects.select_for_update()
+        .filter(pk__in=quantities)
+        .order_by('pk')
+        .values_list('pk', 'stock')
+    )
+    short = sorted(pk for pk, quantity in quantities.items() if stock.get(pk, 0) < quantity)
+    if short:
+        raise serializers.ValidationError(
+            {'items': [f"Not enough stock for product {pk}." for pk in short]}
+        )
+
+    # One UPDATE for all products: SET stock = CASE WHEN id = 1 THEN stock - 2 ... END
+    Product.objects.filter(pk__in=quantities).update(
+        stock=Case(*[When(pk=pk, then=F('stock') - quantity) for pk, quantity in quantities.items()])
+    )
+    # NOTE: update() does not send post_save, so the product list cache is invalidated here
+    transaction.on_commit(lambda: bump_generation(PRODUCT_LIST_NAMESPACE))
 
 
+def reserve_order_stock(order, status, quantities=None):
+    """
+    Reserve or give back stock for an order about to change, before saving it.
+
+    status is the new status of the order, None when it is deleted, and
+    quantities its new {product_id: quantity}, None when the items don't change.
+    Cancelled (and deleted) orders hold no stock. Must run inside transaction.atomic().
+    """
+    # NOTE: The order row is locked before the products, like everywhere else, and
+    # its status read again: two concurrent cancellations give the stock back once
+    held_status = (
+        Order.objects.select_for_update()
+        .filter(pk=order.pk)
+        .values_list('status', flat=True)
+        .first()
+    )
+    held = Counter()
+    items = OrderItem.objects.filter(order=order).values_list('product_id', 'quantity')
+    for product_id, quantity in items:
+        held[product_id] += quantity
+    if quantities is None:
+        quantities = held
+
+    cancelled = (None, Order.StatusChoices.CANCELLED)
+    before = {} if held_status in cancelled else held
+    after = {} if status in cancelled else quantities
+    reserve_stock({pk: after.get(pk, 0) - before.get(pk, 0) for pk in before.keys() | after.keys()})
+
 
 class ProductSerializer(serializers.ModelSerializer):
     class Meta:
@@ -28,6 +99,14 @@ class OrderItemSerializer(serializers.ModelSerializer):
         max_digits=10,
         decimal_places=2,
         source='product.price')
+    item_subtotal = serializers.SerializerMethodField()
+
+    def get_item_subtotal(self, obj):
+        # NOTE: Read the value computed by the database (Order.objects.with_totals())
+        # and only fall back to the Python property when the item was not annotated
+        if hasattr(obj, 'annotated_subtotal'):
+            return obj.annotated_subtotal
+        return obj.item_subtotal
 
     class Meta:
         model = OrderItem
@@ -44,6 +123,9 @@ class OrderSerializer(serializers.ModelSerializer):
     total_price = serializers.SerializerMethodField(method_name='total')
 
     def total(self, obj):
+        # NOTE: Computed in SQL when the queryset used Order.objects.with_totals()
+        if hasattr(obj, 'annotated_total'):
+            return obj.annotated_total
         order_items = obj.items.all()
         return sum(order_item.item_subtotal for order_item in order_items)
 
@@ -58,6 +140,30 @@ class OrderSerializer(serializers.ModelSerializer):
             'total_price',
         )
 
+    def update(self, instance, validated_data):
+        # NOTE: Cancelling an order gives its stock back, un-cancelling takes it again
+        with transaction.atomic():
+            reserve_order_stock(instance, validated_data.get('status', instance.status))
+            return super().update(instance, validated_data)
+
+
+# NOTE: Read only versions for the list views (app/fast_serializers.py).
+# The values the serializers compute in Python come from the annotations of
+# Order.objects.with_totals() instead.
+product_list_serializer = CompiledSerializer(ProductSerializer)
+order_list_serializer = CompiledSerializer(
+    OrderSerializer,
+    sources={'total_price': 'annotated_total'},
+    nested={
+        'items': CompiledSerializer(
+            OrderItemSerializer,
+            sources={'item_subtotal': 'annotated_subtotal'},
+            queryset=OrderItem.objects.annotate(annotated_subtotal=_subtotal_expression()),
+        ),
+    },
+)
+
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     class OrderItemCreateSerializer(serializers.ModelSerializer):
         class Meta:
@@ -68,34 +174,81 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     items = OrderItemCreateSerializer(many=True, required=False)
 
     def update(self, instance, validated_data):
-        orderitem_data = validated_data.pop('items')
+        orderitem_data = validated_data.pop('items', None)
 
         # NOTE: transaction.atomic() ensures that either all these changes are saved to the database, 
         # or if any error occurs, all changes are rolled back
         with transaction.atomic():
+            quantities = None
+            if orderitem_data is not None:
+                quantities = Counter()
+                for item in orderitem_data:
+                    quantities[item['product'].pk] += item['quantity']
+            # Only the difference with the stock the order already holds is reserved or given back
+            reserve_order_stock(instance, validated_data.get('status', instance.status), quantities)
+
             instance = super().update(instance, validated_data)
 
             if orderitem_data is not None:
-                # Clear existing items (optional, depends on requirements)
-                instance.items.all().delete()
-
-                # Recreate items with the updated data
-                for item in orderitem_data:
-                    OrderItem.objects.create(order=instance, **item)
+                self._sync_items(instance, orderitem_data)
         return instance
 
 
     def create(self, validated_data):
-        orderitem_data = validated_data.pop('items')
+        orderitem_data = validated_data.pop('items', [])
 
         with transaction.atomic():
             order = Order.objects.create(**validated_data)
 
+            quantities = Counter()
             for item in orderitem_data:
-                OrderItem.objects.create(order=order, **item)
+                quantities[item['product'].pk] += item['quantity']
+            # Like reserve_order_stock(), a cancelled order holds no stock
+            if order.status != Order.StatusChoices.CANCELLED:
+                reserve_stock(quantities)
+
+            # NOTE: bulk_create sends the lines in batched INSERT statements
+            # instead of one round trip per line
+            OrderItem.objects.bulk_create(
+                [OrderItem(order=order, **item) for item in orderitem_data],
+                batch_size=ORDER_ITEM_BATCH_SIZE,
+            )
 
         return order
 
+    def _sync_items(self, order, orderitem_data):
+        """
+        Diff the existing lines against the incoming ones, by product:
+        unchanged lines are left alone, and only the changed lines are
+        updated, created or deleted, each in one batched statement.
+        """
+        existing = {}
+        for item in OrderItem.objects.filter(order=order):
+            existing.setdefault(item.product_id, []).append(item)
+
+        to_create = []
+        to_update = []
+        for data in orderitem_data:
+            matches = existing.get(data['product'].pk)
+            if not matches:
+                to_create.append(OrderItem(order=order, **data))
+                continue
+            item = matches.pop()
+            if item.quantity != data['quantity']:
+                item.quantity = data['quantity']
+                to_update.append(item)
+
+        to_delete = [item.pk for items in existing.values() for item in items]
+
+        if to_delete:
+            OrderItem.objects.filter(pk__in=to_delete).delete()
+        if to_update:
+            OrderItem.objects.bulk_update(
+                to_update, ['quantity'], batch_size=ORDER_ITEM_BATCH_SIZE
+            )
+        if to_create:
+            OrderItem.objects.bulk_create(to_create, batch_size=ORDER_ITEM_BATCH_SIZE)
+
 
     class Meta:
         model = Order
@@ -113,4 +266,6 @@ class ProductsInfoSerializer(serializers.Serializer):
     products = ProductSerializer(many=True)
     count = serializers.IntegerField()
     max_price = serializers.FloatField()
-    min_price= serializers.FloatField()
\ No newline at end of file
+    min_price= serializers.FloatField()
+    next = serializers.URLField(allow_null=True)
+    previous = serializers.URLField(allow_null=True)
\ No newline at end of file
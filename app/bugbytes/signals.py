@@ -1,7 +1,7 @@
-from django.core.cache import cache
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .cache import PRODUCT_LIST_NAMESPACE, bump_generation
 from .models import Product
 
 
@@ -14,5 +14,6 @@ def invalidate_product_cache(sender, instance, **kwargs):
     """
     print("Clearing product cache")
 
-    # Clear product list caches
-    cache.delete_pattern("*product_list*")
+    # NOTE: Bumping the generation is a single INCR, whereas delete_pattern()
+    # has to SCAN the whole keyspace. Old entries simply expire.
+    bump_generation(PRODUCT_LIST_NAMESPACE)
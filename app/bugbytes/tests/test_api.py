@@ -0,0 +1,373 @@
+"""
+Tests for the bugbytes APIs.
+"""
+
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from bugbytes.models import Order, OrderItem, Product
+
+PRODUCTS_URL = "/api/bugbytes/products/"
+PRODUCTS_INFO_URL = "/api/bugbytes/products/info/"
+ORDERS_URL = "/api/bugbytes/orders/"
+USER_ORDERS_URL = "/api/bugbytes/user-orders/"
+
+
+def order_detail_url(order_id):
+    """Return an order detail URL."""
+    return f"{ORDERS_URL}{order_id}/"
+
+
+def count_statements(queries, keyword):
+    """Count captured SQL statements starting with keyword."""
+    return sum(1 for query in queries if query["sql"].startswith(keyword))
+
+
+def create_product(**params):
+    """Create and return a sample product."""
+    defaults = {
+        "name": "Sample product",
+        "description": "Sample description",
+        "price": Decimal("9.99"),
+        "stock": 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+def create_order(user, items=()):
+    """Create and return an order with (product, quantity) items."""
+    order = Order.objects.create(user=user)
+    for product, quantity in items:
+        OrderItem.objects.create(order=order, product=product, quantity=quantity)
+    return order
+
+
+class ProductsInfoApiTests(TestCase):
+    """Test the products info endpoint."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_products_info(self):
+        """Test count, max and min price are returned."""
+        create_product(price=Decimal("1.50"))
+        create_product(price=Decimal("7.25"))
+        create_product(price=Decimal("3.00"))
+
+        res = self.client.get(PRODUCTS_INFO_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual(res.data["max_price"], 7.25)
+        self.assertEqual(res.data["min_price"], 1.5)
+        self.assertEqual(len(res.data["products"]), 3)
+
+    def test_products_info_empty(self):
+        """Test an empty product table."""
+        res = self.client.get(PRODUCTS_INFO_URL)
+
+        self.assertEqual(res.data["count"], 0)
+        self.assertIsNone(res.data["max_price"])
+        self.assertEqual(res.data["products"], [])
+
+    def test_products_info_query_count(self):
+        """Test one aggregate query plus one page query, whatever the table size."""
+        Product.objects.bulk_create(
+            Product(name=f"p{i}", description="", price=Decimal(i + 1), stock=1)
+            for i in range(150)
+        )
+
+        with self.assertNumQueries(2):
+            res = self.client.get(PRODUCTS_INFO_URL, {"limit": 20, "offset": 40})
+
+        self.assertEqual(res.data["count"], 150)
+        self.assertEqual(res.data["max_price"], 150.0)
+        self.assertEqual(len(res.data["products"]), 20)
+        self.assertEqual(res.data["products"][0]["name"], "p40")
+        self.assertIn("offset=60", res.data["next"])
+
+    def test_products_info_default_page_bounded(self):
+        """Test the product list is limited when no limit is requested."""
+        Product.objects.bulk_create(
+            Product(name=f"p{i}", description="", price=Decimal("1.00"), stock=1)
+            for i in range(120)
+        )
+
+        res = self.client.get(PRODUCTS_INFO_URL)
+
+        self.assertEqual(res.data["count"], 120)
+        self.assertEqual(len(res.data["products"]), 100)
+
+
+class ProductSearchApiTests(TestCase):
+    """Test searching products."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_search_keeps_existing_semantics(self):
+        """Test exact name and partial description matches."""
+        create_product(name="Mango", description="Sweet tropical fruit")
+        create_product(name="Mango juice", description="Drink")
+        create_product(name="Lemon", description="Sour")
+
+        by_name = self.client.get(PRODUCTS_URL, {"search": "mango"})
+        by_description = self.client.get(PRODUCTS_URL, {"search": "tropic"})
+
+        self.assertEqual([p["name"] for p in by_name.json()], ["Mango"])
+        self.assertEqual([p["name"] for p in by_description.json()], ["Mango"])
+
+    def test_name_icontains_filter(self):
+        """Test the name__icontains filter still works."""
+        create_product(name="Blueberry")
+        create_product(name="Cherry")
+
+        res = self.client.get(PRODUCTS_URL, {"name__icontains": "BERRY"})
+
+        self.assertEqual([p["name"] for p in res.json()], ["Blueberry"])
+
+    def test_search_ranked_by_similarity(self):
+        """Test closer matches come first."""
+        create_product(name="Oat bar", description="bar with a hint of chocolate")
+        create_product(name="Chocolate", description="dark chocolate bar")
+
+        res = self.client.get(PRODUCTS_URL, {"search": "chocolate"})
+
+        self.assertEqual([p["name"] for p in res.json()], ["Chocolate", "Oat bar"])
+
+
+class OrderTotalsApiTests(TestCase):
+    """Test order totals computed by the database."""
+
+    def setUp(self):
+        # NOTE: Throttle history lives in the cache
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_order_totals(self):
+        """Test item subtotals and order total."""
+        apple = create_product(name="Apple", price=Decimal("1.25"))
+        pear = create_product(name="Pear", price=Decimal("2.10"))
+        create_order(self.user, [(apple, 4), (pear, 3)])
+
+        res = self.client.get(ORDERS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        order = res.data["results"][0]
+        subtotals = sorted(item["item_subtotal"] for item in order["items"])
+        self.assertEqual(subtotals, [Decimal("5.00"), Decimal("6.30")])
+        self.assertEqual(order["total_price"], Decimal("11.30"))
+
+    def test_empty_order_total(self):
+        """Test an order without items totals 0."""
+        create_order(self.user)
+
+        res = self.client.get(USER_ORDERS_URL)
+
+        self.assertEqual(res.data["results"][0]["total_price"], 0)
+
+    def test_order_list_query_count(self):
+        """Test listing orders does not query per item."""
+        products = [create_product(name=f"p{i}") for i in range(5)]
+        for _ in range(3):
+            create_order(self.user, [(product, 2) for product in products])
+
+        # orders with totals + items with products
+        with self.assertNumQueries(2):
+            res = self.client.get(USER_ORDERS_URL)
+
+        self.assertEqual(len(res.data["results"]), 3)
+        self.assertEqual(res.data["results"][0]["total_price"], Decimal("99.90"))
+
+
+class OrderPaginationApiTests(TestCase):
+    """Test keyset pagination of order lists."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # NOTE: Orders created in the same instant share created_at,
+        # order_id breaks the tie
+        same_instant = timezone.now()
+        self.orders = [create_order(self.user) for _ in range(7)]
+        Order.objects.filter(user=self.user).update(created_at=same_instant)
+        self.expected = [
+            str(order.order_id)
+            for order in Order.objects.order_by("-created_at", "-order_id")
+        ]
+
+    def _walk(self, url, params=None):
+        """Follow next links and return the order ids of every page."""
+        pages = []
+        res = self.client.get(url, params)
+        while True:
+            pages.append([order["order_id"] for order in res.data["results"]])
+            if not res.data["next"]:
+                return pages, res
+            res = self.client.get(res.data["next"])
+
+    def test_pages_cover_every_order_once(self):
+        """Test walking the next links returns each order once, in order."""
+        pages, _ = self._walk(USER_ORDERS_URL, {"size": 3})
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.expected)
+
+    def test_previous_link(self):
+        """Test the previous link returns the page before."""
+        first = self.client.get(USER_ORDERS_URL, {"size": 3})
+        second = self.client.get(first.data["next"])
+
+        res = self.client.get(second.data["previous"])
+
+        self.assertEqual(res.data["results"], first.data["results"])
+        self.assertIsNone(res.data["previous"])
+
+    def test_page_query_count_constant(self):
+        """Test a later page costs the same number of queries as the first."""
+        first = self.client.get(ORDERS_URL, {"size": 2})
+
+        with self.assertNumQueries(2):
+            res = self.client.get(first.data["next"])
+
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        res = self.client.get(USER_ORDERS_URL, {"cursor": "garbage"})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class StreamingListApiTests(TestCase):
+    """Test lists streamed with ?stream=true."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _stream(self, url, params=None):
+        res = self.client.get(url, {"stream": "true", **(params or {})})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "application/json")
+        return json.loads(b"".join(res.streaming_content))
+
+    @patch("bugbytes.views.ProductListCreateAPIView.stream_chunk_size", 2)
+    def test_products_streamed_in_chunks(self):
+        """Test the streamed products are the list, across several chunks."""
+        for i in range(5):
+            create_product(name=f"Product {i}")
+        expected = self.client.get(PRODUCTS_URL, {"ordering": "name"}).json()
+
+        self.assertEqual(self._stream(PRODUCTS_URL, {"ordering": "name"}), expected)
+        # Filters still apply
+        self.assertEqual(len(self._stream(PRODUCTS_URL, {"name__iexact": "Product 1"})), 1)
+
+    def test_empty_stream(self):
+        """Test an empty list streams an empty array."""
+        self.assertEqual(self._stream(PRODUCTS_URL), [])
+
+    @patch("bugbytes.views.OrderViewSet.stream_chunk_size", 2)
+    def test_orders_streamed_unpaginated(self):
+        """Test every order is streamed with its items, not only the first page."""
+        products = [create_product(name=f"p{i}") for i in range(2)]
+        for _ in range(25):
+            create_order(self.user, [(product, 1) for product in products])
+
+        orders = self._stream(ORDERS_URL)
+
+        self.assertEqual(len(orders), 25)
+        self.assertTrue(all(len(order["items"]) == 2 for order in orders))
+        self.assertEqual(orders[0]["total_price"], 19.98)
+
+
+@patch("bugbytes.views.send_order_confirmation_email")
+class OrderWriteApiTests(TestCase):
+    """Test creating and updating orders."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.products = [create_product(name=f"p{i}") for i in range(4)]
+
+    def test_create_order_bulk_inserts_items(self, patched_email):
+        """Test all lines are inserted with one INSERT statement."""
+        payload = {
+            "status": "Pending",
+            "items": [{"product": p.id, "quantity": 2} for p in self.products],
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.post(ORDERS_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        order = Order.objects.get(order_id=res.data["order_id"])
+        self.assertEqual(order.items.count(), 4)
+        # one for the order, one for all the lines
+        self.assertEqual(count_statements(queries, "INSERT"), 2)
+        patched_email.delay.assert_called_once()
+
+    def test_update_order_only_touches_changed_items(self, patched_email):
+        """Test unchanged lines keep their row, others are updated, added or removed."""
+        p0, p1, p2, p3 = self.products
+        order = create_order(self.user, [(p0, 1), (p1, 1), (p2, 1)])
+        kept = order.items.get(product=p0)
+        payload = {
+            "status": "Confirmed",
+            "items": [
+                {"product": p0.id, "quantity": 1},
+                {"product": p1.id, "quantity": 5},
+                {"product": p3.id, "quantity": 2},
+            ],
+        }
+
+        res = self.client.put(order_detail_url(order.order_id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        items = {item.product_id: item for item in order.items.all()}
+        self.assertEqual(set(items), {p0.id, p1.id, p3.id})
+        self.assertEqual(items[p0.id].pk, kept.pk)
+        self.assertEqual(items[p1.id].quantity, 5)
+        self.assertEqual(items[p3.id].quantity, 2)
+
+    def test_update_order_without_items_keeps_items(self, patched_email):
+        """Test omitting items leaves the order lines untouched."""
+        order = create_order(self.user, [(self.products[0], 3)])
+
+        res = self.client.put(
+            order_detail_url(order.order_id), {"status": "Cancelled"}, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        order.refresh_from_db()
+        self.assertEqual(order.status, "Cancelled")
+        self.assertEqual(order.items.get().quantity, 3)
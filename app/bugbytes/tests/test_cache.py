@@ -0,0 +1,174 @@
+"""
+Tests for the product list cache.
+"""
+
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import QueryDict
+from django.test import SimpleTestCase, TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from bugbytes.cache import (
+    PRODUCT_LIST_NAMESPACE,
+    bump_generation,
+    get_generation,
+    normalize_query_params,
+)
+from bugbytes.models import Product
+
+PRODUCTS_URL = "/api/bugbytes/products/"
+
+
+def create_product(**params):
+    """Create and return a sample product."""
+    defaults = {
+        "name": "Sample product",
+        "description": "Sample description",
+        "price": Decimal("9.99"),
+        "stock": 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+class GenerationTests(TestCase):
+    """Test the generation counter."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_increments_generation(self):
+        """Test bumping returns a newer generation."""
+        before = get_generation(PRODUCT_LIST_NAMESPACE)
+
+        after = bump_generation(PRODUCT_LIST_NAMESPACE)
+
+        self.assertEqual(after, before + 1)
+        self.assertEqual(get_generation(PRODUCT_LIST_NAMESPACE), after)
+
+    def test_bump_missing_generation(self):
+        """Test bumping an evicted generation still moves forward."""
+        before = get_generation(PRODUCT_LIST_NAMESPACE)
+        cache.clear()
+
+        after = bump_generation(PRODUCT_LIST_NAMESPACE)
+
+        self.assertGreater(after, before)
+
+    def test_product_save_bumps_generation(self):
+        """Test saving and deleting a product invalidates the namespace."""
+        before = get_generation(PRODUCT_LIST_NAMESPACE)
+
+        product = create_product()
+        after_save = get_generation(PRODUCT_LIST_NAMESPACE)
+        product.delete()
+
+        self.assertGreater(after_save, before)
+        self.assertGreater(get_generation(PRODUCT_LIST_NAMESPACE), after_save)
+
+
+class ProductListCacheTests(TestCase):
+    """Test the cached product list endpoint."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def test_list_served_from_cache(self):
+        """Test the second request does not hit the database."""
+        create_product()
+        self.client.get(PRODUCTS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.json()), 1)
+
+    def test_product_change_invalidates_list(self):
+        """Test a new product shows up right after being saved."""
+        create_product(name="First")
+        self.client.get(PRODUCTS_URL)
+
+        create_product(name="Second")
+        res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(len(res.json()), 2)
+
+    def test_list_shared_between_users(self):
+        """Test anonymous and authenticated users share one cached copy."""
+        user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        create_product()
+        self.client.get(PRODUCTS_URL)
+
+        self.client.force_authenticate(user)
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_query_string_normalized(self):
+        """Test parameter order and blank values hit the same entry."""
+        create_product(name="Apple")
+        self.client.get(PRODUCTS_URL, {"ordering": "price", "search": "Apple"})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(f"{PRODUCTS_URL}?search=Apple&name__icontains=&ordering=price")
+
+        self.assertEqual(len(res.json()), 1)
+
+    def test_different_filters_cached_separately(self):
+        """Test different filters do not share a cached response."""
+        create_product(name="Apple")
+        create_product(name="Banana")
+        self.client.get(PRODUCTS_URL, {"search": "Apple"})
+
+        res = self.client.get(PRODUCTS_URL, {"search": "Banana"})
+
+        self.assertEqual(len(res.json()), 1)
+        self.assertEqual(res.json()[0]["name"], "Banana")
+
+    def test_cache_hit_keeps_headers(self):
+        """Test a response served from cache has the headers of the original one."""
+        create_product()
+        first = self.client.get(PRODUCTS_URL)
+
+        with self.assertNumQueries(0):
+            res = self.client.get(PRODUCTS_URL)
+
+        for header in ("Content-Type", "Vary", "Allow"):
+            self.assertEqual(res[header], first[header])
+
+    def test_browsable_api_not_cached(self):
+        """Test the HTML page of a superuser is not served to other users."""
+        admin = get_user_model().objects.create_superuser(
+            email="admin@example.com", password="testpass123"
+        )
+        create_product()
+        self.client.force_authenticate(admin)
+        res = self.client.get(PRODUCTS_URL, HTTP_ACCEPT="text/html")
+        self.assertContains(res, "admin@example.com")
+
+        self.client.force_authenticate(None)
+        res = self.client.get(PRODUCTS_URL, HTTP_ACCEPT="text/html")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotContains(res, "admin@example.com")
+        self.assertNotContains(res, "csrfmiddlewaretoken")
+
+
+class NormalizeQueryParamsTests(SimpleTestCase):
+    """Test query string normalization."""
+
+    def test_normalize_sorts_and_drops_blank(self):
+        """Test keys and values are sorted and blank values dropped."""
+        params = QueryDict("search=b&ordering=price&search=a&name__icontains=")
+
+        self.assertEqual(
+            normalize_query_params(params), "ordering=price&search=a&search=b"
+        )
@@ -0,0 +1,72 @@
+"""
+Tests for the bugbytes filters.
+"""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from bugbytes.filters import OrderFilter
+from bugbytes.models import Order
+
+TAIPEI = ZoneInfo("Asia/Taipei")
+
+
+def create_order(user, created_at):
+    """Create an order at a given time (auto_now_add is bypassed with update())."""
+    order = Order.objects.create(user=user)
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+    return order
+
+
+class OrderDateFilterTests(TestCase):
+    """Test filtering orders by day."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+
+    def test_filter_whole_day(self):
+        """Test both ends of the day match and the next midnight does not."""
+        tz = timezone.get_current_timezone()
+        start = create_order(self.user, datetime(2025, 4, 1, 0, 0, tzinfo=tz))
+        end = create_order(self.user, datetime(2025, 4, 1, 23, 59, 59, tzinfo=tz))
+        create_order(self.user, datetime(2025, 4, 2, 0, 0, tzinfo=tz))
+        create_order(self.user, datetime(2025, 3, 31, 23, 59, tzinfo=tz))
+
+        qs = OrderFilter({"created_at": "2025-04-01"}, queryset=Order.objects.all()).qs
+
+        self.assertEqual(set(qs), {start, end})
+
+    def test_filter_uses_current_time_zone(self):
+        """Test the day boundaries follow the active time zone."""
+        # 2025-04-01 20:00 UTC is already 2025-04-02 04:00 in Taipei
+        order = create_order(self.user, datetime(2025, 4, 1, 20, 0, tzinfo=ZoneInfo("UTC")))
+
+        with timezone.override(TAIPEI):
+            qs = OrderFilter({"created_at": "2025-04-02"}, queryset=Order.objects.all()).qs
+            self.assertEqual(list(qs), [order])
+
+    def test_filter_uses_index(self):
+        """Test the day filter is an index range condition on created_at."""
+        qs = OrderFilter(
+            {"created_at": "2025-04-01"}, queryset=Order.objects.filter(user=self.user)
+        ).qs
+
+        # NOTE: The test table is tiny, so the planner would pick a sequential scan
+        # anyway; disabling it shows whether an index *can* serve the query.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = qs.explain()
+
+        index_conditions = [
+            line for line in plan.splitlines() if "Index Cond" in line
+        ]
+        self.assertTrue(index_conditions, plan)
+        self.assertIn("created_at", index_conditions[0])
+        self.assertNotIn("::date", plan)
@@ -0,0 +1,263 @@
+"""
+Tests for stock reservation by orders.
+"""
+
+import threading
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from rest_framework import serializers, status
+from rest_framework.test import APIClient
+
+from bugbytes.models import Order, Product
+from bugbytes.serializers import OrderCreateSerializer
+
+ORDERS_URL = "/api/bugbytes/orders/"
+
+
+def create_product(**params):
+    """Create and return a sample product."""
+    defaults = {
+        "name": "Sample product",
+        "description": "Sample description",
+        "price": Decimal("9.99"),
+        "stock": 10,
+    }
+    defaults.update(params)
+    return Product.objects.create(**defaults)
+
+
+@patch("bugbytes.views.send_order_confirmation_email")
+class StockReservationTests(TestCase):
+    """Test orders take and give back product stock."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create_order_reserves_stock(self, patched_email):
+        """Test stock is decremented by the ordered quantities."""
+        product = create_product(stock=10)
+        payload = {
+            "items": [
+                {"product": product.id, "quantity": 3},
+                {"product": product.id, "quantity": 2},
+            ]
+        }
+
+        res = self.client.post(ORDERS_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 5)
+
+    def test_create_order_oversold_rejected(self, patched_email):
+        """Test an order is rejected as a whole when a line exceeds stock."""
+        available = create_product(name="Available", stock=10)
+        scarce = create_product(name="Scarce", stock=1)
+        payload = {
+            "items": [
+                {"product": available.id, "quantity": 1},
+                {"product": scarce.id, "quantity": 2},
+            ]
+        }
+
+        res = self.client.post(ORDERS_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(str(scarce.id), res.data["items"][0])
+        self.assertFalse(Order.objects.exists())
+        available.refresh_from_db()
+        self.assertEqual(available.stock, 10)
+        patched_email.delay.assert_not_called()
+
+    def test_update_order_adjusts_stock(self, patched_email):
+        """Test updating lines only reserves or releases the difference."""
+        kept = create_product(name="Kept", stock=10)
+        removed = create_product(name="Removed", stock=10)
+        res = self.client.post(
+            ORDERS_URL,
+            {
+                "items": [
+                    {"product": kept.id, "quantity": 2},
+                    {"product": removed.id, "quantity": 4},
+                ]
+            },
+            format="json",
+        )
+
+        self.client.put(
+            f"{ORDERS_URL}{res.data['order_id']}/",
+            {"items": [{"product": kept.id, "quantity": 5}]},
+            format="json",
+        )
+
+        kept.refresh_from_db()
+        removed.refresh_from_db()
+        self.assertEqual(kept.stock, 5)
+        self.assertEqual(removed.stock, 10)
+
+    def _create_order(self, product, quantity):
+        res = self.client.post(
+            ORDERS_URL, {"items": [{"product": product.id, "quantity": quantity}]}, format="json"
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return f"{ORDERS_URL}{res.data['order_id']}/"
+
+    def test_delete_order_releases_stock(self, patched_email):
+        """Test deleting an order gives its stock back."""
+        product = create_product(stock=10)
+        url = self._create_order(product, 4)
+
+        res = self.client.delete(url)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_cancel_order_releases_stock(self, patched_email):
+        """Test cancelling an order gives its stock back, once."""
+        product = create_product(stock=10)
+        url = self._create_order(product, 4)
+
+        res = self.client.patch(url, {"status": Order.StatusChoices.CANCELLED}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+        # Cancelled again, or deleted once cancelled: nothing more is given back
+        self.client.patch(url, {"status": Order.StatusChoices.CANCELLED}, format="json")
+        self.client.delete(url)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_create_cancelled_order_takes_no_stock(self, patched_email):
+        """Test an order created cancelled takes stock only once un-cancelled, and gives it back."""
+        product = create_product(stock=10)
+        res = self.client.post(
+            ORDERS_URL,
+            {
+                "status": Order.StatusChoices.CANCELLED,
+                "items": [{"product": product.id, "quantity": 4}],
+            },
+            format="json",
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+        url = f"{ORDERS_URL}{res.data['order_id']}/"
+
+        self.client.patch(url, {"status": Order.StatusChoices.PENDING}, format="json")
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 6)
+
+        self.client.delete(url)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+    def test_cancelled_order_holds_no_stock(self, patched_email):
+        """Test lines changed while cancelled take no stock, un-cancelling takes it again."""
+        product = create_product(stock=10)
+        url = self._create_order(product, 4)
+        self.client.patch(url, {"status": Order.StatusChoices.CANCELLED}, format="json")
+
+        self.client.put(
+            url,
+            {
+                "status": Order.StatusChoices.CANCELLED,
+                "items": [{"product": product.id, "quantity": 6}],
+            },
+            format="json",
+        )
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 10)
+
+        res = self.client.patch(url, {"status": Order.StatusChoices.CONFIRMED}, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 4)
+
+
+# NOTE: TransactionTestCase commits for real, which the threads need to see each other's writes.
+# Row locks only exist on databases supporting SELECT ... FOR UPDATE (Postgres, not SQLite).
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentCheckoutTests(TransactionTestCase):
+    """Stress stock reservation with concurrent checkouts."""
+
+    THREADS = 20
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="testpass123"
+        )
+
+    def _checkout_concurrently(self, payloads):
+        """Run one order creation per payload in parallel, return the outcomes."""
+        barrier = threading.Barrier(len(payloads))
+        outcomes = []
+
+        def checkout(payload):
+            try:
+                serializer = OrderCreateSerializer(data=payload)
+                serializer.is_valid(raise_exception=True)
+                barrier.wait()
+                serializer.save(user=self.user)
+                outcomes.append("ok")
+            except serializers.ValidationError:
+                outcomes.append("rejected")
+            except Exception as exc:  # deadlocks end up here
+                outcomes.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=(p,)) for p in payloads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_hot_product_never_oversold(self):
+        """Test exactly `stock` single-unit orders succeed."""
+        product = create_product(stock=7)
+        payload = {"items": [{"product": product.id, "quantity": 1}]}
+
+        outcomes = self._checkout_concurrently([payload] * self.THREADS)
+
+        self.assertEqual(outcomes.count("ok"), 7)
+        self.assertEqual(outcomes.count("rejected"), self.THREADS - 7)
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), 7)
+
+    def test_opposite_line_order_no_deadlock(self):
+        """Test orders listing the same products in opposite order all succeed."""
+        first = create_product(name="First", stock=100)
+        second = create_product(name="Second", stock=100)
+        forward = {
+            "items": [
+                {"product": first.id, "quantity": 1},
+                {"product": second.id, "quantity": 1},
+            ]
+        }
+        backward = {"items": list(reversed(forward["items"]))}
+
+        outcomes = self._checkout_concurrently(
+            [forward, backward] * (self.THREADS // 2)
+        )
+
+        self.assertEqual(outcomes, ["ok"] * self.THREADS)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.stock, 100 - self.THREADS)
+        self.assertEqual(second.stock, 100 - self.THREADS)
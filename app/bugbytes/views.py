@@ -1,8 +1,8 @@
-from django.db.models import Max, Min
+from app.fast_serializers import CompiledListMixin
+from django.db import transaction
+from django.db.models import Count, Max, Min
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-from django.views.decorators.vary import vary_on_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, generics, viewsets
 from rest_framework.decorators import api_view
@@ -12,22 +12,36 @@ from rest_framework.response import Response
 from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 
-from .filters import InStockFilterBackend, OrderFilter, ProductFilter
+from .cache import PRODUCT_LIST_NAMESPACE, cache_response
+from .filters import (
+    InStockFilterBackend,
+    OrderFilter,
+    ProductFilter,
+    ProductSearchFilter,
+)
 from .models import Order, Product
+from .pagination import OrderCursorPagination, ProductsInfoPagination
 from .serializers import (
     OrderCreateSerializer,
     OrderSerializer,
     ProductSerializer,
     ProductsInfoSerializer,
+    order_list_serializer,
+    product_list_serializer,
+    reserve_order_stock,
 )
 from .tasks import send_order_confirmation_email
 
 
 # NOTE: DRF provides set of custom generic views to handle common tasks
 # In this case, ListCreateAPIView to handle both listing and creating products
-class ProductListCreateAPIView(generics.ListCreateAPIView):
+class ProductListCreateAPIView(CompiledListMixin, generics.ListCreateAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    # NOTE: The list is serialized from .values() rows by a compiled serializer,
+    # same output without a model instance and field objects per row.
+    # ?stream=true streams the whole list instead, e.g. for exports
+    compiled_serializer = product_list_serializer
     filterset_class = ProductFilter
 
     # NOTE: Allowing to request a specific number of records (limit) starting from a
@@ -44,7 +58,8 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
     filter_backends = [
         # Note: Must also add this to ensure proper doc, even already applied ProductSerializer
         DjangoFilterBackend,
-        filters.SearchFilter,
+        # NOTE: Same as filters.SearchFilter, plus ranking by similarity (see filters.py)
+        ProductSearchFilter,
         filters.OrderingFilter,
         # NOTE: This will be directly applied
         InStockFilterBackend,
@@ -53,21 +68,16 @@ class ProductListCreateAPIView(generics.ListCreateAPIView):
     ordering_fields = ["name", "price", "stock"]
 
     # NOTE: CACHING: 60 * 15 is 15 minutes
-    @method_decorator(cache_page(60 * 15, key_prefix="product_list"))
-    # NOTE: VARYING: This decorator is used to vary the cache based on the Authorization header
-    # This means that if the request has an Authorization header, the cache will be different
-    @method_decorator(vary_on_headers("Authorization"))
-    # Important: After this applied, we might need a more precise cache clear mechanism for each user, possible to update in signals.py
+    # The key prefix includes a generation number that signals.py bumps on every product change
+    # NOTE: TIERS: The key is built from the normalized query string (filters, search, ordering),
+    # not the Authorization header. The product list is the same for every caller,
+    # so all users share one copy; pass vary_on_user=True for views whose output depends on the user.
+    # NOTE: To see the cache at work, slow down the queries of this view with
+    # settings.FAULT_INJECTION (app/middleware.py): cache hits run no query, so they stay fast.
+    @method_decorator(cache_response(60 * 15, PRODUCT_LIST_NAMESPACE))
     def list(self, request, *args, **kwargs):
         return super().list(request, *args, **kwargs)
 
-    # NOTE: This method is for demo purpose: to show the cache actually works
-    def get_queryset(self):
-        import time
-
-        time.sleep(2)
-        return super().get_queryset()
-
     # NOTE: Customize the permission classes for this view
     def get_permissions(self):
         self.permission_classes = [AllowAny]
@@ -87,12 +97,17 @@ def product_detail(request, pk):
     return Response(serializer.data)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(CompiledListMixin, viewsets.ModelViewSet):
     throttle_scope = "orders"
     throttle_classes = [ScopedRateThrottle]
-    queryset = Order.objects.prefetch_related("items__product")
+    # NOTE: with_totals() prefetches items with their product and lets the
+    # database compute item subtotals and order totals (see models.py)
+    queryset = Order.objects.with_totals()
     serializer_class = OrderSerializer
-    pagination_class = None
+    compiled_serializer = order_list_serializer
+    # NOTE: Keyset pagination: ?cursor= links to the next/previous page, ?size= sets the page size.
+    # Only the orders of the current page (and their items) are loaded.
+    pagination_class = OrderCursorPagination
     filterset_class = OrderFilter
     filter_backends = [DjangoFilterBackend]
 
@@ -103,6 +118,12 @@ class OrderViewSet(viewsets.ModelViewSet):
         # This will push the task to the queue
         send_order_confirmation_email.delay(order.order_id, self.request.user.email)
 
+    def perform_destroy(self, instance):
+        # NOTE: The stock the order holds goes back to its products
+        with transaction.atomic():
+            reserve_order_stock(instance, None)
+            instance.delete()
+
     def get_serializer_class(self):
         # can also check if POST: if self.request.method == 'POST'
         if self.action == "create" or self.action == "update":
@@ -123,19 +144,34 @@ class OrderViewSet(viewsets.ModelViewSet):
 # It also provides access to request and response objects,
 # making it easier to work with API requests and responses
 class ProductsInfoAPIView(APIView):
+    pagination_class = ProductsInfoPagination
+
     def get(self, request):
-        products = Product.objects.all()
+        products = Product.objects.order_by("pk")
+        # NOTE:
+        # .aggregate() is a Django QuerySet method that performs a calculation over all objects and returns a dictionary
+        # Count, Max and Min are computed in ONE SQL query:
+        # SELECT COUNT(id), MAX(price), MIN(price) FROM bugbytes_product
+        # aggregate() transforms to a SQL command to calculate in DB level, making it more efficient
+        # than len(products), which loads every row into Python
+        info = Product.objects.aggregate(
+            count=Count("pk"),
+            max_price=Max("price"),
+            min_price=Min("price"),
+        )
+
+        # NOTE: Only the requested page of products is fetched (?limit=&offset=),
+        # reusing the count above instead of a second COUNT query
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(
+            products, request, view=self, count=info["count"]
+        )
         serializer = ProductsInfoSerializer(
             {
-                "products": products,
-                "count": len(products),
-                # NOTE:
-                # .aggregate() is a Django QuerySet method that performs a calculation over all objects and returns a dictionary
-                # max_price=Max('price') is specifying what we want to calculate
-                # ['max_price'] is accessing the result of the aggregation by its key
-                # aggregate() transforms to a SQL command to calculate in DB level, making it more efficient
-                "max_price": products.aggregate(max_price=Max("price"))["max_price"],
-                "min_price": products.aggregate(min_price=Min("price"))["min_price"],
+                "products": page,
+                **info,
+                "next": paginator.get_next_link(),
+                "previous": paginator.get_previous_link(),
             }
         )
         return Response(serializer.data)
@@ -154,13 +190,16 @@ class ProductDetailAPIView(generics.RetrieveAPIView):
     lookup_url_kwarg = "product_id"
 
 
-class UserOrderListAPIView(generics.ListAPIView):
+class UserOrderListAPIView(CompiledListMixin, generics.ListAPIView):
     # NOTE:
     # prefetch_related() is used to optimize database access by reducing the number of queries
     # especially when dealing with many-to-many relationships
     # Detail: notes/django/prefetch_related.md
-    queryset = Order.objects.prefetch_related("items__product")
+    # with_totals() does the same prefetch and also annotates totals in SQL
+    queryset = Order.objects.with_totals()
     serializer_class = OrderSerializer
+    compiled_serializer = order_list_serializer
+    pagination_class = OrderCursorPagination
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -0,0 +1,34 @@
+"""
+Password hashers whose cost is read from settings.PASSWORD_HASHING.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# NOTE: The costs are properties, not class attributes, so they follow the settings.
+# Django's check_password() calls must_update() on every successful login,
+# and when the stored hash was made with another hasher or other costs, the
+# password is hashed again with the current ones (transparent rehash on login).
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Argon2id, memory-hard: each hash needs ARGON2_MEMORY_COST KiB of RAM."""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_HASHING["ARGON2_TIME_COST"]
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_HASHING["ARGON2_MEMORY_COST"]
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_HASHING["ARGON2_PARALLELISM"]
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with PBKDF2_ITERATIONS iterations."""
+
+    @property
+    def iterations(self):
+        return settings.PASSWORD_HASHING["PBKDF2_ITERATIONS"]
@@ -0,0 +1,128 @@
+"""
+Django command to benchmark requests per second with and without database connection reuse.
+
+Each request goes through the WSGI handler, so connections are opened and
+closed by Django's request signals exactly as under a real server.
+
+Usage:
+    python manage.py bench_db_connections --requests 500 --threads 4
+"""
+
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+
+from tags.models import Tag
+from user.serializers import UserTokenObtainPairSerializer
+
+BENCH_EMAIL = "bench_db_connections@example.com"
+
+
+def start_response(status, headers):
+    assert status.startswith("200"), status
+
+
+class Command(BaseCommand):
+    """Compare a connection per request, persistent connections, and a pool."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--threads", type=int, default=1)
+        parser.add_argument(
+            "--pool-size", type=int, help="Pool max_size, defaults to --threads."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        Tag.objects.bulk_create(Tag(user=user, name=f"tag {i}") for i in range(20))
+        token = UserTokenObtainPairSerializer.get_token(user).access_token
+        environ = RequestFactory().get(
+            reverse("tags:tag-list"), HTTP_AUTHORIZATION=f"Bearer {token}"
+        ).environ
+
+        pool_size = options["pool_size"] or options["threads"]
+        modes = [
+            ("per request", {"CONN_MAX_AGE": 0}, None),
+            ("persistent", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": False}, None),
+            ("persistent + health", {"CONN_MAX_AGE": 60, "CONN_HEALTH_CHECKS": True}, None),
+            (
+                "pool",
+                {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+                {"min_size": pool_size, "max_size": pool_size, "timeout": 10},
+            ),
+        ]
+
+        # NOTE: Every thread's connection is built from this dict, changing it switches mode
+        db_settings = connections.settings["default"]
+        original = {key: db_settings.get(key) for key in ("CONN_MAX_AGE", "CONN_HEALTH_CHECKS")}
+        original_options = dict(db_settings["OPTIONS"])
+        try:
+            self.stdout.write(f"{'mode':<20} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+            with override_settings(ALLOWED_HOSTS=["testserver"]):
+                for label, conn_settings, pool in modes:
+                    if pool and (django.VERSION < (5, 1) or not is_psycopg3):
+                        # Not with the Docker image, see DB_POOL in app/settings.py
+                        self.stdout.write(f"{label:<20} skipped, requires Django >= 5.1 and psycopg 3")
+                        continue
+                    connections.close_all()
+                    db_settings.update(conn_settings)
+                    db_settings["OPTIONS"] = (
+                        {**original_options, "pool": pool} if pool else original_options
+                    )
+                    try:
+                        self._bench(label, environ, options["requests"], options["threads"])
+                    finally:
+                        connections.close_all()
+                        if pool:
+                            connections["default"].close_pool()
+        finally:
+            db_settings.update(original)
+            db_settings["OPTIONS"] = original_options
+            user.delete()
+
+    def _bench(self, label, environ, requests, threads):
+        handler = WSGIHandler()
+        per_thread = requests // threads
+        # Every worker thread has its own connection, closed after its requests
+        barrier = threading.Barrier(threads)
+
+        def worker():
+            latencies = []
+            try:
+                barrier.wait()
+                for _ in range(per_thread):
+                    start = time.perf_counter()
+                    response = handler(dict(environ), start_response)
+                    b"".join(response)
+                    # Sends request_finished, which closes or keeps the connection
+                    response.close()
+                    latencies.append((time.perf_counter() - start) * 1000)
+            finally:
+                connections.close_all()
+            return latencies
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(threads) as executor:
+            futures = [executor.submit(worker) for _ in range(threads)]
+            latencies = sorted(lat for future in futures for lat in future.result())
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(
+            f"{label:<20} {len(latencies) / elapsed:>8.0f} "
+            f"{statistics.median(latencies):>8.2f} "
+            f"{latencies[int(len(latencies) * 0.99) - 1]:>8.2f}"
+        )
@@ -48,6 +48,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
+    # NOTE: Copied into every JWT issued to the user (user.authentication).
+    # Incrementing it invalidates all the tokens issued before.
+    token_version = models.PositiveIntegerField(default=0)
 
     # NOTE: Every Django model has at least one manager,
     # and the default manager is called objects.
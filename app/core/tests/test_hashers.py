@@ -0,0 +1,83 @@
+"""
+Tests for the password hashers.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import identify_hasher
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+USER_LOGIN_URL = reverse("user_login")
+ADMIN_LOGIN_URL = reverse("admin_login")
+
+ARGON2_FIRST = [
+    "core.hashers.Argon2PasswordHasher",
+    "core.hashers.PBKDF2PasswordHasher",
+]
+PBKDF2_FIRST = ARGON2_FIRST[::-1]
+LOW_COST = {
+    "ARGON2_TIME_COST": 1,
+    "ARGON2_MEMORY_COST": 8192,
+    "ARGON2_PARALLELISM": 1,
+    "PBKDF2_ITERATIONS": 1000,
+}
+
+
+@override_settings(PASSWORD_HASHERS=ARGON2_FIRST, PASSWORD_HASHING=LOW_COST)
+class PasswordHasherTests(TestCase):
+    """Test passwords are hashed again at login when the hasher or costs change."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _create_user(self, **params):
+        return get_user_model().objects.create_user(
+            email="user@example.com", password="userpass123", **params
+        )
+
+    def _login(self, url=USER_LOGIN_URL):
+        res = self.client.post(url, {"email": "user@example.com", "password": "userpass123"})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_new_password_uses_configured_costs(self):
+        """Test new passwords are hashed with the first hasher and costs from settings."""
+        user = self._create_user()
+
+        self.assertEqual(identify_hasher(user.password).algorithm, "argon2")
+        self.assertIn("$m=8192,t=1,p=1$", user.password)
+
+    def test_other_hasher_rehashed_on_login(self):
+        """Test a PBKDF2 password is hashed with Argon2 at login."""
+        with self.settings(PASSWORD_HASHERS=PBKDF2_FIRST):
+            user = self._create_user()
+        self.assertEqual(identify_hasher(user.password).algorithm, "pbkdf2_sha256")
+
+        self._login()
+
+        user.refresh_from_db()
+        self.assertEqual(identify_hasher(user.password).algorithm, "argon2")
+        self.assertTrue(user.check_password("userpass123"))
+
+    def test_cost_change_rehashed_on_login(self):
+        """Test a password hashed with other costs is hashed again at admin login."""
+        user = self._create_user(is_staff=True)
+
+        with self.settings(PASSWORD_HASHING={**LOW_COST, "ARGON2_TIME_COST": 2}):
+            self._login(ADMIN_LOGIN_URL)
+
+        user.refresh_from_db()
+        self.assertIn("$m=8192,t=2,p=1$", user.password)
+
+    def test_unchanged_hash_not_saved(self):
+        """Test logging in with the current hasher and costs doesn't write the user."""
+        user = self._create_user()
+        self._login()
+
+        user.refresh_from_db()
+        password = user.password
+        self._login()
+
+        user.refresh_from_db()
+        self.assertEqual(user.password, password)
@@ -11,5 +11,11 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            # Serves WHERE user_id = ... ORDER BY name DESC, the paginated list
+            models.Index(fields=["user", "name"], name="ingredient_user_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
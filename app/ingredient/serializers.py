@@ -1,3 +1,4 @@
+from app.fast_serializers import CompiledSerializer
 from ingredient.models import Ingredient
 from rest_framework import serializers
 
@@ -9,3 +10,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         model = Ingredient
         fields = ["id", "name"]
         read_only_fields = ["id"]
+
+
+# NOTE: Read only, for the list view (app/fast_serializers.py)
+ingredient_list_serializer = CompiledSerializer(IngredientSerializer)
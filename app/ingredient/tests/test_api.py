@@ -69,6 +69,21 @@ class PrivateIngredientsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_ingredients_paginated(self):
+        """Test ?paginate=true limits the page size and links the next page."""
+        user2 = create_user(email="user2@example.com")
+        Ingredient.objects.create(user=user2, name="Salt")
+        for name in ["Kale", "Pepper", "Vanilla"]:
+            Ingredient.objects.create(user=self.user, name=name)
+
+        res = self.client.get(INGREDIENTS_URL, {"paginate": "true", "size": 2})
+        next_res = self.client.get(res.data["next"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([i["name"] for i in res.data["results"]], ["Vanilla", "Pepper"])
+        self.assertEqual([i["name"] for i in next_res.data["results"]], ["Kale"])
+        self.assertIsNone(next_res.data["next"])
+
     def test_ingredients_limited_to_user(self):
         """Test list of ingredients is limited to authenticated user."""
         user2 = create_user(email="user2@example.com")
@@ -1,11 +1,14 @@
+from app.fast_serializers import CompiledListMixin
+from app.pagination import NameCursorPagination
 from ingredient import serializers
 from ingredient.models import Ingredient
 from rest_framework import mixins, viewsets
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from user.authentication import ClaimsJWTAuthentication
 
 
 class IngredientViewSet(
+    CompiledListMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.UpdateModelMixin,
@@ -15,9 +18,11 @@ class IngredientViewSet(
     """Manage ingredients in the database."""
 
     serializer_class = serializers.IngredientSerializer
+    compiled_serializer = serializers.ingredient_list_serializer
     queryset = Ingredient.objects.all()
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameCursorPagination
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
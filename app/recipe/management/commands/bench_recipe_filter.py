@@ -0,0 +1,129 @@
+"""
+Django command to benchmark recipe tag filtering, JOIN + DISTINCT against EXISTS.
+
+Usage:
+    python manage.py bench_recipe_filter --recipes 100000 --tags-per-recipe 20
+"""
+
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from recipe.models import Recipe
+from recipe.views import RECIPE_LIST_COLUMNS, RecipeViewSet
+from tags.models import Tag
+
+BENCH_EMAIL = "bench_recipe_filter@example.com"
+SEED_BATCH_SIZE = 10000
+PAGE_SIZE = 50
+
+
+def legacy_queryset(user, tag_ids, match_all):
+    """The previous implementation: join the junction table, then DISTINCT."""
+    queryset = Recipe.objects.filter(user=user)
+    if match_all:
+        # One more join per tag
+        for tag_id in tag_ids:
+            queryset = queryset.filter(tags__id=tag_id)
+    else:
+        queryset = queryset.filter(tags__id__in=tag_ids)
+    return queryset.only(*RECIPE_LIST_COLUMNS).order_by("-id").distinct()
+
+
+def exists_queryset(user, tag_ids, match_all):
+    """The current RecipeViewSet list queryset, without the prefetches of the serializer."""
+    params = {"tags": ",".join(map(str, tag_ids))}
+    if match_all:
+        params["tags_match"] = "all"
+    request = Request(APIRequestFactory().get("/", params))
+    request.user = user
+    view = RecipeViewSet(request=request, action="list", format_kwarg=None)
+    return view.get_queryset().prefetch_related(None)
+
+
+class Command(BaseCommand):
+    """Compare p50/p99 of the first page and of the full result for both filters."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--tags", type=int, default=100, help="Tags owned by the user.")
+        parser.add_argument("--tags-per-recipe", type=int, default=20)
+        parser.add_argument("--queries", type=int, default=50)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rng = random.Random(options["seed"])
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        try:
+            tags = self._seed(rng, user, options)
+            cases = [
+                ("any of 1 tag", 1, False),
+                ("any of 5 tags", 5, False),
+                ("all of 2 tags", 2, True),
+                ("all of 3 tags", 3, True),
+            ]
+            self.stdout.write(
+                f"{'case':<16} {'query':<8} {'page p50':>9} {'page p99':>9} "
+                f"{'all p50':>9} {'all p99':>9}"
+            )
+            for label, count, match_all in cases:
+                samples = [rng.sample(tags, count) for _ in range(options["queries"])]
+                for name, build in (("legacy", legacy_queryset), ("exists", exists_queryset)):
+                    page = self._time(samples, lambda ids: build(user, ids, match_all)[:PAGE_SIZE])
+                    full = self._time(samples, lambda ids: build(user, ids, match_all))
+                    self.stdout.write(
+                        f"{label:<16} {name:<8} {statistics.median(page):>9.2f} "
+                        f"{max(page):>9.2f} {statistics.median(full):>9.2f} {max(full):>9.2f}"
+                    )
+        finally:
+            # NOTE: _raw_delete skips the collector, which would load every recipe and link
+            Recipe.tags.through.objects.filter(recipe__user=user)._raw_delete(
+                using=connection.alias
+            )
+            Recipe.objects.filter(user=user)._raw_delete(using=connection.alias)
+            user.delete()
+
+    def _seed(self, rng, user, options):
+        recipes, per_recipe = options["recipes"], options["tags_per_recipe"]
+        self.stdout.write(f"Seeding {recipes} recipes x {per_recipe} tags...")
+        tag_ids = [
+            tag.id
+            for tag in Tag.objects.bulk_create(
+                Tag(user=user, name=f"tag {i}") for i in range(options["tags"])
+            )
+        ]
+        Link = Recipe.tags.through
+        for start in range(0, recipes, SEED_BATCH_SIZE):
+            batch = Recipe.objects.bulk_create(
+                Recipe(user=user, title=f"bench {i}", time_minutes=10, price=Decimal("1.00"))
+                for i in range(start, min(start + SEED_BATCH_SIZE, recipes))
+            )
+            Link.objects.bulk_create(
+                Link(recipe_id=recipe.id, tag_id=tag_id)
+                for recipe in batch
+                for tag_id in rng.sample(tag_ids, per_recipe)
+            )
+        with connection.cursor() as cursor:
+            cursor.execute(f"VACUUM ANALYZE {Recipe._meta.db_table}")
+            cursor.execute(f"VACUUM ANALYZE {Link._meta.db_table}")
+        return tag_ids
+
+    def _time(self, samples, build_query):
+        """Duration in ms of evaluating the query built for each sample."""
+        timings = []
+        for tag_ids in samples:
+            query = build_query(tag_ids)
+            start = time.perf_counter()
+            list(query)
+            timings.append((time.perf_counter() - start) * 1000)
+        return timings
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Reverse (related_id, recipe_id) indexes on the auto created M2M junction tables.
+
+    The unique (recipe_id, tag_id) constraint Django creates already serves the
+    EXISTS lookup done per recipe. These indexes serve the other direction, starting
+    from the requested tag/ingredient IDs, and let Postgres answer both from the
+    index alone. Auto created through tables have no Meta, hence the raw SQL.
+    """
+
+    dependencies = [
+        ("recipe", "0004_recipe_image"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            "CREATE INDEX recipe_tags_tag_recipe_idx "
+            "ON recipe_recipe_tags (tag_id, recipe_id);",
+            reverse_sql="DROP INDEX recipe_tags_tag_recipe_idx;",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX recipe_ingredients_ingredient_recipe_idx "
+            "ON recipe_recipe_ingredients (ingredient_id, recipe_id);",
+            reverse_sql="DROP INDEX recipe_ingredients_ingredient_recipe_idx;",
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredient', '0002_ingredient_ingredient_user_name_idx'),
+        ('recipe', '0005_recipe_junction_indexes'),
+        ('tags', '0002_tag_tag_user_name_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+        ),
+    ]
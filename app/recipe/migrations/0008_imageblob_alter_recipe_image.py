@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:36
+
+import recipe.models
+import recipe.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_image_references(apps, schema_editor):
+    """Create the reference counts of the images stored before content addressing."""
+    Recipe = apps.get_model("recipe", "Recipe")
+    ImageBlob = apps.get_model("recipe", "ImageBlob")
+    counts = (
+        Recipe.objects.exclude(image__isnull=True)
+        .exclude(image="")
+        .values("image")
+        .annotate(ref_count=Count("pk"))
+    )
+    ImageBlob.objects.bulk_create(
+        (ImageBlob(name=row["image"], ref_count=row["ref_count"]) for row in counts),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0007_recipe_image_renditions_recipe_image_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('ref_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='image',
+            field=models.ImageField(null=True, storage=recipe.storage.ContentAddressedStorage(), upload_to=recipe.models.recipe_image_file_path),
+        ),
+        migrations.RunPython(count_image_references, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ import os
 import uuid
 
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
+from recipe.storage import ContentAddressedStorage
 
 
 def recipe_image_file_path(instance, filename):
@@ -16,6 +18,12 @@ def recipe_image_file_path(instance, filename):
 class Recipe(models.Model):
     """Recipe object."""
 
+    class ImageStatus(models.TextChoices):
+        NONE = "none"
+        PENDING = "pending"
+        READY = "ready"
+        FAILED = "failed"
+
     user = models.ForeignKey(
         # NOTE: Django automatically assumes foreign keys link to the primary key of the referenced model
         settings.AUTH_USER_MODEL,
@@ -39,7 +47,66 @@ class Recipe(models.Model):
     )
     ingredients = models.ManyToManyField("ingredient.Ingredient")
     # NOTE: ImageField is a built-in FileField with additional validation for image files
-    image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # NOTE: The storage names the file after its SHA-256, identical uploads share one file
+    image = models.ImageField(
+        null=True,
+        upload_to=recipe_image_file_path,
+        storage=ContentAddressedStorage(),
+    )
+    # NOTE: Set by recipe.tasks.process_recipe_image once the upload is decoded
+    image_status = models.CharField(
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.NONE,
+    )
+    # Resized copies of image, {"thumbnail": "uploads/recipe/<uuid>_thumbnail.webp", ...}
+    image_renditions = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        indexes = [
+            # Serves WHERE user_id = ... ORDER BY id DESC, the paginated recipe list
+            models.Index(fields=["user", "id"], name="recipe_user_id_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class ImageBlobManager(models.Manager):
+    def lock(self, name):
+        """Lock the row of the stored file name, created if missing, until the transaction ends."""
+        blob, _ = self.select_for_update().get_or_create(name=name)
+        return blob
+
+    def acquire(self, name):
+        """Count one more recipe using the stored file name."""
+        with transaction.atomic():
+            blob = self.lock(name)
+            self.filter(pk=blob.pk).update(ref_count=F("ref_count") + 1)
+
+    def release(self, name):
+        """Count one recipe less using name, collect the file when none is left."""
+        from recipe.tasks import delete_orphan_image
+
+        with transaction.atomic():
+            self.filter(name=name).update(ref_count=F("ref_count") - 1)
+            if self.filter(name=name, ref_count__lte=0).exists():
+                # NOTE: The countdown keeps a file uploaded again soon after from
+                # being deleted and written again (the row lock keeps it consistent)
+                transaction.on_commit(
+                    lambda: delete_orphan_image.apply_async(
+                        (name,), countdown=settings.RECIPE_IMAGE_GC_DELAY
+                    )
+                )
+
+
+class ImageBlob(models.Model):
+    """A file of the recipe image storage, and how many recipes use it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    ref_count = models.IntegerField(default=0)
+
+    objects = ImageBlobManager()
+
+    def __str__(self):
+        return self.name
@@ -0,0 +1,93 @@
+"""
+Parsers for the recipe APIs.
+"""
+
+import hashlib
+import os
+
+from django.conf import settings
+from PIL import Image
+from recipe.models import Recipe, recipe_image_file_path
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser
+
+# Pillow format: file extension
+IMAGE_EXTENSIONS = {"JPEG": ".jpg", "PNG": ".png", "WEBP": ".webp", "GIF": ".gif"}
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Upload too large."
+    default_code = "upload_too_large"
+
+
+class StreamingImageParser(BaseParser):
+    """
+    Write a raw image request body to MEDIA_ROOT as it arrives.
+
+    MultiPartParser buffers the upload (in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE,
+    then in a temporary file) and ImageField then decodes it before anything is saved.
+    This parser reads the body chunk by chunk into its final directory, hashing it on
+    the way, so memory use is one chunk whatever the file size. The digest then names
+    the file in the content addressed storage (recipe.storage). Only the image header
+    is parsed to check the format; decoding is left to recipe.tasks.
+
+    request.data is {"path": local path of the upload, "name": its name in the storage
+    before hashing, "sha256": hex digest, "size": bytes}.
+    """
+
+    media_type = "image/*"
+    chunk_size = 64 * 1024
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        max_size = settings.RECIPE_IMAGE_MAX_UPLOAD_SIZE
+        request = parser_context["request"]
+        # NOTE: Refuse from the header when possible, before reading anything
+        content_length = int(request.META.get("CONTENT_LENGTH") or 0)
+        if content_length > max_size:
+            raise UploadTooLarge(f"Upload exceeds {max_size} bytes.")
+        if stream is None:
+            raise ParseError("Empty upload.")
+
+        storage = Recipe._meta.get_field("image").storage
+        partial_name = recipe_image_file_path(None, "upload.part")
+        partial_path = storage.path(partial_name)
+        os.makedirs(os.path.dirname(partial_path), exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(partial_path, "wb") as file:
+                while chunk := stream.read(self.chunk_size):
+                    size += len(chunk)
+                    # Don't rely on the header alone, count what is actually read
+                    if size > max_size:
+                        raise UploadTooLarge(f"Upload exceeds {max_size} bytes.")
+                    digest.update(chunk)
+                    file.write(chunk)
+            extension = self._validate_header(partial_path)
+        except BaseException:
+            os.remove(partial_path)
+            raise
+
+        # NOTE: Moved into the storage by the view, with
+        # ContentAddressedStorage.save_hashed_file() in the transaction acquiring it
+        return {
+            "path": partial_path,
+            "name": partial_name.replace(".part", extension),
+            "sha256": digest.hexdigest(),
+            "size": size,
+        }
+
+    def _validate_header(self, path):
+        """Return the file extension of the image format, read from the header only."""
+        try:
+            # NOTE: Image.open() is lazy: it reads the header (format, mode, size)
+            # and doesn't decode any pixel until load() is called
+            with Image.open(path) as img:
+                image_format = img.format
+        except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+            raise ParseError("Upload a valid image.")
+        if image_format not in IMAGE_EXTENSIONS:
+            raise ParseError(f"Unsupported image format {image_format}.")
+        return IMAGE_EXTENSIONS[image_format]
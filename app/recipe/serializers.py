@@ -2,54 +2,118 @@
 Serializers for recipe APIs
 """
 
-from typing import List
+from typing import List, Optional
 
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from ingredient.models import Ingredient
 from ingredient.serializers import IngredientSerializer
-from recipe.models import Recipe
+from recipe.models import ImageBlob, Recipe
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from tags.models import Tag
 from tags.serializers import TagSerializer
 
 
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """
+    ManyRelatedField resolving every submitted pk with a single query.
+
+    The default ManyRelatedField runs one SELECT per pk through its child.
+    Here all pks are looked up at once: WHERE id IN (...) AND <child queryset>,
+    and every pk that wasn't found is reported in one error.
+    """
+
+    default_error_messages = {
+        "does_not_exist": "Invalid pk(s) {pk_values} - object(s) do not exist or do not belong to this user.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+
+        queryset = self.child_relation.get_queryset()
+        pk_field = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            if isinstance(item, bool) or not isinstance(item, (str, int)):
+                self.child_relation.fail("incorrect_type", data_type=type(item).__name__)
+            try:
+                pk = pk_field.to_python(item)
+            except DjangoValidationError:
+                self.child_relation.fail("incorrect_type", data_type=type(item).__name__)
+            if pk not in pks:
+                pks.append(pk)
+
+        # NOTE: in_bulk() returns {pk: object} from one WHERE pk IN (...) query
+        found = queryset.in_bulk(pks)
+        missing = [pk for pk in pks if pk not in found]
+        if missing:
+            self.fail("does_not_exist", pk_values=missing)
+        return [found[pk] for pk in pks]
+
+
+class UserOwnedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key related field limited to objects owned by the request user."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(user=self.context["request"].user)
+
+    # NOTE: many_init is what DRF calls for many=True,
+    # it is overridden to return the bulk field above instead of ManyRelatedField
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipes."""
 
     # Instead of a custom field, use a PrimaryKeyRelatedField with many=True
     # This will ensure Swagger properly shows it as a list of integers
-    tags = serializers.PrimaryKeyRelatedField(
+    # NOTE: UserOwnedPrimaryKeyRelatedField only accepts the user's own tags/ingredients
+    # and resolves all submitted ids in one query, instead of one query per id
+    # plus one more per object to check its user.
+    tags = UserOwnedPrimaryKeyRelatedField(
         many=True, queryset=Tag.objects.all(), required=False
     )
 
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = UserOwnedPrimaryKeyRelatedField(
         many=True, queryset=Ingredient.objects.all(), required=False
     )
 
+    thumbnail = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
-        fields = ["id", "title", "time_minutes", "price", "link", "tags", "ingredients"]
+        fields = [
+            "id",
+            "title",
+            "time_minutes",
+            "price",
+            "link",
+            "tags",
+            "ingredients",
+            "thumbnail",
+        ]
         read_only_fields = ["id"]
 
-    # NOTE: validate_<field_name> is a built-in field-level validation system in DRF.
-    def validate_tags(self, tags):
-        """Validate that tags belong to the user."""
-        user = self.context["request"].user
-        for tag in tags:
-            if tag.user != user:
-                raise serializers.ValidationError(
-                    f"Tag with id {tag.id} does not belong to this user"
-                )
-        return tags
-
-    def validate_ingredients(self, ingredients):
-        """Validate that ingredients belong to the user."""
-        user = self.context["request"].user
-        for ingredient in ingredients:
-            if ingredient.user != user:
-                raise serializers.ValidationError(
-                    f"Ingredient with id {ingredient.id} does not belong to this user"
-                )
-        return ingredients
+    def get_thumbnail(self, instance) -> Optional[str]:
+        """URL of the small WebP copy of the image, once processed."""
+        path = instance.image_renditions.get("thumbnail")
+        return self._rendition_url(path) if path else None
+
+    def _rendition_url(self, path):
+        """Absolute URL of a rendition, like ImageField renders image."""
+        url = Recipe._meta.get_field("image").storage.url(path)
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
 
     def to_representation(self, instance):
         """Convert the representation to include full tag data."""
@@ -67,15 +131,50 @@ class RecipeSerializer(serializers.ModelSerializer):
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view."""
 
+    image_renditions = serializers.SerializerMethodField()
+
     class Meta(RecipeSerializer.Meta):
-        fields = RecipeSerializer.Meta.fields + ["description", "image"]
+        fields = RecipeSerializer.Meta.fields + [
+            "description",
+            "image",
+            "image_status",
+            "image_renditions",
+        ]
+        read_only_fields = RecipeSerializer.Meta.read_only_fields + [
+            "image",
+            "image_status",
+        ]
+
+    def get_image_renditions(self, instance) -> dict:
+        """URLs of all the resized copies of the image."""
+        return {
+            name: self._rendition_url(path)
+            for name, path in instance.image_renditions.items()
+        }
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
 
+    # NOTE: A plain FileField, the serializers.ImageField default of the model field
+    # would decode the whole image with Pillow during the request.
+    # recipe.tasks.process_recipe_image validates and decodes it in a Celery worker.
+    image = serializers.FileField(required=True)
+
     class Meta:
         model = Recipe
-        fields = ["id", "image"]
-        read_only_fields = ["id"]
-        extra_kwargs = {"image": {"required": "True"}}
+        fields = ["id", "image", "image_status"]
+        read_only_fields = ["id", "image_status"]
+
+    def update(self, instance, validated_data):
+        previous_image = instance.image.name
+        validated_data["image_status"] = Recipe.ImageStatus.PENDING
+        validated_data["image_renditions"] = {}
+        with transaction.atomic():
+            recipe = super().update(instance, validated_data)
+            # NOTE: Stored files are shared between recipes with the same image,
+            # the replaced one is only deleted once no recipe uses it anymore
+            ImageBlob.objects.acquire(recipe.image.name)
+            if previous_image:
+                ImageBlob.objects.release(previous_image)
+        return recipe
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import ImageBlob, Recipe
+
+
+@receiver(post_delete, sender=Recipe)
+def release_recipe_image(sender, instance, **kwargs):
+    """
+    Release the stored image of a deleted recipe, collected once no recipe uses it.
+    """
+    if instance.image:
+        ImageBlob.objects.release(instance.image.name)
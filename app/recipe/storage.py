@@ -0,0 +1,93 @@
+"""
+Content addressed storage for recipe images.
+"""
+
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage naming files after the SHA-256 of their content.
+
+    upload_to only gives the directory and the extension:
+        uploads/recipe/<uuid>.jpg -> uploads/recipe/3f/3fa8...e1.jpg
+    The same photo uploaded 1000 times is stored once; saving content that is already
+    stored writes nothing and returns the existing name. Because names are shared,
+    files are never deleted directly, recipe.models.ImageBlob counts the recipes
+    using each file and recipe.tasks.delete_orphan_image removes unused ones.
+
+    Save inside the transaction acquiring the name (ImageBlob.objects.acquire):
+    the ImageBlob row is locked before checking whether the content is stored,
+    and delete_orphan_image locks it too, so a file found here can't be collected
+    before it is acquired, and a file being collected is stored again.
+    """
+
+    chunk_size = 64 * 1024
+
+    def content_name(self, digest, name):
+        """Storage name for content with the given digest, saved under name."""
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], f"{digest}{extension}")
+
+    def save(self, name, content, max_length=None):
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        # NOTE: chunks() starts from the beginning of the file, and so does super().save()
+        for chunk in content.chunks(self.chunk_size):
+            digest.update(chunk)
+
+        target = self.content_name(digest.hexdigest(), name)
+        with transaction.atomic():
+            self._lock(target)
+            if self.exists(target):
+                return target
+            saved = super().save(target, content, max_length)
+        if saved != target:
+            # Saved concurrently with the same content, FileSystemStorage made the name unique
+            self.delete(saved)
+        return target
+
+    def save_hashed_file(self, path, digest, name):
+        """
+        Move a local file whose SHA-256 is already known into the storage.
+
+        For uploads hashed while they were written (recipe.parsers), so the file
+        isn't read a second time. The local file is removed if the content is
+        already stored.
+        """
+        target = self.content_name(digest, name)
+        with transaction.atomic():
+            self._lock(target)
+            if self.exists(target):
+                os.remove(path)
+                return target
+            full_path = self.path(target)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(path, full_path)
+        return target
+
+    def _lock(self, name):
+        # NOTE: Imported here, recipe.models imports this module for the image field
+        from recipe.models import ImageBlob
+
+        ImageBlob.objects.lock(name)
+
+    def save_derived(self, name, content):
+        """
+        Save a file computed from a stored one (a rendition) under the given name.
+
+        The name is derived from the source file name, so an existing file
+        already has the expected content and is kept as is.
+        """
+        if self.exists(name):
+            return name
+        return super().save(name, content)
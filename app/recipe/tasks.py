@@ -0,0 +1,125 @@
+"""
+Celery tasks for recipe images.
+"""
+
+import os
+from io import BytesIO
+
+from celery import shared_task
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from recipe.models import ImageBlob, Recipe
+
+# name: (bounding box, format)
+RENDITIONS = {
+    "thumbnail": ((200, 200), "WEBP"),
+    "medium": ((800, 800), "WEBP"),
+    # For clients without WebP support
+    "thumbnail_jpeg": ((200, 200), "JPEG"),
+}
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def rendition_names(name):
+    """Storage names of the renditions of the stored image name."""
+    stem = os.path.splitext(name)[0]
+    return {
+        rendition: f"{stem}_{rendition}.{EXTENSIONS[image_format]}"
+        for rendition, (_, image_format) in RENDITIONS.items()
+    }
+
+
+def make_renditions(image_field):
+    """
+    Decode an uploaded image and save its resized copies next to it.
+
+    Return {rendition name: storage path}. Raise OSError/SyntaxError/ValueError
+    or Image.DecompressionBombError when the file isn't a usable image.
+    """
+    storage, name = image_field.storage, image_field.name
+    names = rendition_names(name)
+    # NOTE: Stored images are named after their content (recipe.storage), when the same
+    # photo was uploaded before its renditions already exist
+    if all(storage.exists(path) for path in names.values()):
+        return names
+
+    # NOTE: verify() checks the file structure without decoding the pixels,
+    # but leaves the image unusable, so it is opened a second time to decode it.
+    with storage.open(name) as file, Image.open(file) as img:
+        img.verify()
+
+    largest = max(box for box, _ in RENDITIONS.values())
+    with storage.open(name) as file, Image.open(file) as img:
+        # NOTE: For JPEG, draft() makes the decoder scale down by 1/2, 1/4 or 1/8 while
+        # reading, much faster and smaller than decoding the full size original
+        img.draft("RGB", largest)
+        img = ImageOps.exif_transpose(img)
+        for rendition, (box, image_format) in RENDITIONS.items():
+            resized = img.copy()
+            resized.thumbnail(box)
+            if image_format == "JPEG" or resized.mode not in ("RGB", "RGBA"):
+                resized = resized.convert("RGBA" if image_format == "WEBP" else "RGB")
+            buffer = BytesIO()
+            resized.save(buffer, image_format, quality=80)
+            storage.save_derived(names[rendition], ContentFile(buffer.getvalue()))
+    return names
+
+
+@shared_task
+def process_recipe_image(recipe_id, image_name):
+    """
+    Validate the uploaded image of a recipe and record its renditions.
+
+    Args:
+        recipe_id (int): The recipe the image was uploaded to.
+        image_name (str): Storage path of the upload, the task does nothing if the
+            recipe has a different image by the time it runs (replaced meanwhile).
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).first()
+    if recipe is None:
+        return
+
+    try:
+        renditions = make_renditions(recipe.image)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError):
+        with transaction.atomic():
+            updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+                image=None, image_status=Recipe.ImageStatus.FAILED, image_renditions={}
+            )
+            if updated:
+                ImageBlob.objects.release(image_name)
+        return
+
+    # NOTE: The filter on image makes this a compare-and-set,
+    # a newer upload isn't overwritten by the renditions of an older one
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_status=Recipe.ImageStatus.READY, image_renditions=renditions
+    )
+
+
+@shared_task
+def delete_orphan_image(name):
+    """
+    Delete a stored recipe image and its renditions once no recipe uses it.
+
+    Args:
+        name (str): Storage path of the image, scheduled by ImageBlob.objects.release().
+    """
+    storage = Recipe._meta.get_field("image").storage
+    with transaction.atomic():
+        # NOTE: Uploads of the same content lock the row too (recipe.storage):
+        # one which found the file waits for this to see it acquired, one
+        # arriving now waits for the files to be gone and stores them again
+        blob = (
+            ImageBlob.objects.select_for_update()
+            .filter(name=name, ref_count__lte=0)
+            .first()
+        )
+        if blob is None:
+            # Used again since, or already collected
+            return
+
+        for path in [name, *rendition_names(name).values()]:
+            storage.delete(path)
+        blob.delete()
@@ -2,16 +2,20 @@
 Tests for recipe APIs.
 """
 
+import hashlib
 import os
 import tempfile
 from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from ingredient.models import Ingredient
 from PIL import Image
-from recipe.models import Recipe
+from recipe.models import ImageBlob, Recipe
 from recipe.serializers import RecipeDetailSerializer, RecipeSerializer
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -25,6 +29,18 @@ def image_upload_url(recipe_id):
     return reverse("recipe:recipe-upload-image", args=[recipe_id])
 
 
+def image_stream_url(recipe_id):
+    """Create and return a streaming image upload URL."""
+    return reverse("recipe:recipe-upload-image-stream", args=[recipe_id])
+
+
+def image_bytes(image_format="PNG"):
+    """Return an encoded sample image."""
+    buffer = BytesIO()
+    Image.new("RGB", (10, 10)).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
 def detail_url(recipe_id):
     """Create and return a recipe detail URL."""
     return reverse("recipe:recipe-detail", args=[recipe_id])
@@ -98,6 +114,44 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_recipes_query_count_constant(self):
+        """Test listing recipes costs the same queries for 1 or many recipes."""
+
+        def create_recipes(count):
+            for i in range(count):
+                recipe = create_recipe(user=self.user, title=f"Recipe {i}")
+                recipe.tags.add(Tag.objects.create(user=self.user, name=f"Tag {i}"))
+                recipe.ingredients.add(
+                    Ingredient.objects.create(user=self.user, name=f"Ingredient {i}")
+                )
+
+        create_recipes(1)
+        # recipes + tags + ingredients
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+        create_recipes(20)
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+
+        self.assertEqual(len(res.data), 21)
+        self.assertEqual(len(res.data[0]["tags"]), 1)
+        self.assertEqual(len(res.data[0]["ingredients"]), 1)
+
+    def test_list_recipes_paginated(self):
+        """Test ?paginate=true returns the newest recipes first, one page at a time."""
+        recipes = [create_recipe(user=self.user, title=f"Recipe {i}") for i in range(3)]
+
+        res = self.client.get(RECIPES_URL, {"paginate": "true", "size": 2})
+        next_res = self.client.get(res.data["next"])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r["id"] for r in res.data["results"]], [recipes[2].id, recipes[1].id]
+        )
+        self.assertEqual([r["id"] for r in next_res.data["results"]], [recipes[0].id])
+        self.assertIsNone(res.data["previous"])
+
     def test_get_recipe_detail(self):
         """Test get recipe detail."""
         recipe = create_recipe(user=self.user)
@@ -241,6 +295,55 @@ class PrivateRecipeApiTests(TestCase):
         # Verify no recipe was created
         self.assertEqual(Recipe.objects.filter(user=self.user).count(), 0)
 
+    def test_create_recipe_fail_with_other_users_tags(self):
+        """Test tags of another user are rejected, all reported together."""
+        other_user = create_user(email="other@example.com", password="test123")
+        own_tag = Tag.objects.create(user=self.user, name="Mine")
+        foreign_tags = [
+            Tag.objects.create(user=other_user, name="Theirs 1"),
+            Tag.objects.create(user=other_user, name="Theirs 2"),
+        ]
+        payload = {
+            "title": "Ramen",
+            "time_minutes": 20,
+            "price": Decimal("8.00"),
+            "tags": [own_tag.id] + [tag.id for tag in foreign_tags] + [999999],
+        }
+
+        res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(
+            f"[{foreign_tags[0].id}, {foreign_tags[1].id}, 999999]",
+            str(res.data["tags"][0]),
+        )
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_create_recipe_with_many_tags_query_count(self):
+        """Test tags and ingredients are resolved in one query each."""
+        tags = [Tag.objects.create(user=self.user, name=f"Tag {i}") for i in range(50)]
+        ingredients = [
+            Ingredient.objects.create(user=self.user, name=f"Ingredient {i}")
+            for i in range(50)
+        ]
+        payload = {
+            "title": "Everything soup",
+            "time_minutes": 90,
+            "price": Decimal("9.00"),
+            "tags": [tag.id for tag in tags],
+            "ingredients": [ingredient.id for ingredient in ingredients],
+        }
+
+        # 2 lookups, recipe insert, 2 x (read + insert) of the junction
+        # tables, 2 reads for the response, savepoint + release
+        with self.assertNumQueries(11):
+            res = self.client.post(RECIPES_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data["id"])
+        self.assertEqual(recipe.tags.count(), 50)
+        self.assertEqual(recipe.ingredients.count(), 50)
+
     def test_update_recipe_assign_tag(self):
         """Test assigning an existing tag when updating a recipe."""
         tag_breakfast = Tag.objects.create(user=self.user, name="Breakfast")
@@ -357,6 +460,34 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_by_tags_returns_each_recipe_once(self):
+        """Test a recipe matching several tags is listed once."""
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Dessert")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data], [recipe.id])
+
+    def test_filter_by_all_tags(self):
+        """Test tags_match=all only returns recipes having every tag."""
+        tag1 = Tag.objects.create(user=self.user, name="Vegan")
+        tag2 = Tag.objects.create(user=self.user, name="Dessert")
+        tag3 = Tag.objects.create(user=self.user, name="Quick")
+        both = create_recipe(user=self.user, title="Vegan brownies")
+        both.tags.add(tag1, tag2, tag3)
+        one = create_recipe(user=self.user, title="Vegan curry")
+        one.tags.add(tag1, tag3)
+
+        params = {"tags": f"{tag1.id},{tag2.id},{tag2.id}", "tags_match": "all"}
+        res = self.client.get(RECIPES_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r["id"] for r in res.data], [both.id])
+
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
         r1 = create_recipe(user=self.user, title="Posh Beans on Toast")
@@ -378,6 +509,7 @@ class PrivateRecipeApiTests(TestCase):
         self.assertNotIn(s3.data, res.data)
 
 
+@patch("recipe.views.process_recipe_image")
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
 
@@ -393,7 +525,7 @@ class ImageUploadTests(TestCase):
     def tearDown(self):
         self.recipe.image.delete()
 
-    def test_upload_image(self):
+    def test_upload_image(self, patched_task):
         """Test uploading an image to a recipe."""
         url = image_upload_url(self.recipe.id)
         with tempfile.NamedTemporaryFile(suffix=".jpg") as image_file:
@@ -401,17 +533,103 @@ class ImageUploadTests(TestCase):
             img.save(image_file, format="JPEG")
             image_file.seek(0)
             payload = {"image": image_file}
-            res = self.client.post(url, payload, format="multipart")
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(url, payload, format="multipart")
 
         self.recipe.refresh_from_db()
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
         self.assertIn("image", res.data)
+        self.assertEqual(res.data["image_status"], Recipe.ImageStatus.PENDING)
         self.assertTrue(os.path.exists(self.recipe.image.path))
+        patched_task.delay.assert_called_once_with(self.recipe.id, self.recipe.image.name)
 
-    def test_upload_image_bad_request(self):
+    def test_upload_image_bad_request(self, patched_task):
         """Test uploading an invalid image."""
         url = image_upload_url(self.recipe.id)
         payload = {"image": "notanimage"}
         res = self.client.post(url, payload, format="multipart")
 
         self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        patched_task.delay.assert_not_called()
+
+    def _stored_uploads(self):
+        """Names of the files in the recipe upload directory."""
+        storage = self.recipe.image.storage
+        if not storage.exists("uploads/recipe"):
+            return set()
+        return set(storage.listdir("uploads/recipe")[1])
+
+    def test_upload_image_stream(self, patched_task):
+        """Test streaming an image as the raw request body."""
+        content = image_bytes("PNG")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.put(
+                image_stream_url(self.recipe.id), content, content_type="image/png"
+            )
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(res.data["sha256"], hashlib.sha256(content).hexdigest())
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.PENDING)
+        self.assertTrue(self.recipe.image.name.endswith(".png"))
+        with open(self.recipe.image.path, "rb") as file:
+            self.assertEqual(file.read(), content)
+        patched_task.delay.assert_called_once_with(self.recipe.id, self.recipe.image.name)
+
+    @override_settings(RECIPE_IMAGE_MAX_UPLOAD_SIZE=16)
+    def test_upload_image_stream_too_large(self, patched_task):
+        """Test a body over the size cap is refused and nothing is kept."""
+        before = self._stored_uploads()
+
+        res = self.client.put(
+            image_stream_url(self.recipe.id), image_bytes("PNG"), content_type="image/png"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        self.assertEqual(self._stored_uploads(), before)
+        patched_task.delay.assert_not_called()
+
+    def test_upload_image_stream_not_an_image(self, patched_task):
+        """Test a body without an image header is refused and removed."""
+        before = self._stored_uploads()
+
+        res = self.client.put(
+            image_stream_url(self.recipe.id), b"x" * 1000, content_type="image/jpeg"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._stored_uploads(), before)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_stream_failure_keeps_nothing(self, patched_task):
+        """Test an error after the body was written stores no file and removes the upload."""
+        content = image_bytes("GIF")
+        storage = self.recipe.image.storage
+        name = storage.content_name(hashlib.sha256(content).hexdigest(), "uploads/recipe/x.gif")
+        # Not stored by another test, and not left behind by this one
+        storage.delete(name)
+        self.addCleanup(storage.delete, name)
+        before = self._stored_uploads()
+
+        with patch.object(ImageBlob.objects, "acquire", side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client.put(image_stream_url(self.recipe.id), content, content_type="image/gif")
+
+        self.assertFalse(storage.exists(name))
+        self.assertEqual(self._stored_uploads(), before)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_upload_image_stream_other_users_recipe(self, patched_task):
+        """Test nothing is written for a recipe of another user."""
+        other = create_recipe(user=create_user(email="other@example.com", password="pass123"))
+        before = self._stored_uploads()
+
+        res = self.client.put(
+            image_stream_url(other.id), image_bytes("PNG"), content_type="image/png"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._stored_uploads(), before)
@@ -0,0 +1,192 @@
+"""
+Tests for the content addressed storage of recipe images.
+"""
+
+import hashlib
+import threading
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from PIL import Image
+from recipe.models import ImageBlob, Recipe
+from recipe.storage import ContentAddressedStorage
+from recipe.tasks import delete_orphan_image, rendition_names
+from rest_framework import status
+from rest_framework.test import APIClient
+
+
+def image_bytes(color="red"):
+    """Return an encoded sample image."""
+    buffer = BytesIO()
+    Image.new("RGB", (10, 10), color=color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class ContentAddressedStorageTests(TestCase):
+    """Test files are named after their content."""
+
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+
+    def test_same_content_stored_once(self):
+        """Test saving the same content twice returns the same name."""
+        content = image_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+
+        first = self.storage.save("uploads/recipe/a.PNG", ContentFile(content))
+        second = self.storage.save("uploads/recipe/b.png", ContentFile(content))
+        self.addCleanup(self.storage.delete, first)
+
+        self.assertEqual(first, f"uploads/recipe/{digest[:2]}/{digest}.png")
+        self.assertEqual(second, first)
+        with self.storage.open(first) as file:
+            self.assertEqual(file.read(), content)
+
+    def test_different_content_stored_apart(self):
+        """Test different content gets different names."""
+        first = self.storage.save("uploads/recipe/a.png", ContentFile(image_bytes("red")))
+        second = self.storage.save("uploads/recipe/a.png", ContentFile(image_bytes("blue")))
+        self.addCleanup(self.storage.delete, first)
+        self.addCleanup(self.storage.delete, second)
+
+        self.assertNotEqual(first, second)
+
+
+@patch("recipe.tasks.delete_orphan_image")
+@patch("recipe.views.process_recipe_image")
+class ImageReferenceCountTests(TestCase):
+    """Test stored images are shared by recipes and collected when unused."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user("user@example.com", "pass123")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipes = [
+            Recipe.objects.create(
+                user=self.user, title=f"Recipe {i}", time_minutes=5, price=Decimal("1.00")
+            )
+            for i in range(2)
+        ]
+
+    def _upload(self, recipe, content):
+        url = reverse("recipe:recipe-upload-image-stream", args=[recipe.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.put(url, content, content_type="image/png")
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        recipe.refresh_from_db()
+        return recipe.image.name
+
+    def test_image_shared_and_collected(self, patched_process, patched_gc):
+        """Test one file for both recipes, deleted after the last one lets it go."""
+        shared = self._upload(self.recipes[0], image_bytes("red"))
+        self.assertEqual(self._upload(self.recipes[1], image_bytes("red")), shared)
+        self.assertEqual(ImageBlob.objects.get(name=shared).ref_count, 2)
+
+        # Replacing the image of one recipe keeps the file for the other
+        other = self._upload(self.recipes[0], image_bytes("blue"))
+        self.addCleanup(self.recipes[0].image.storage.delete, other)
+        self.assertEqual(ImageBlob.objects.get(name=shared).ref_count, 1)
+        patched_gc.apply_async.assert_not_called()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipes[1].delete()
+
+        self.assertEqual(ImageBlob.objects.get(name=shared).ref_count, 0)
+        patched_gc.apply_async.assert_called_once()
+        self.assertEqual(patched_gc.apply_async.call_args.args[0], (shared,))
+
+        storage = self.recipes[0].image.storage
+        storage.save_derived(rendition_names(shared)["thumbnail"], ContentFile(b"webp"))
+        delete_orphan_image(shared)
+
+        self.assertFalse(storage.exists(shared))
+        self.assertFalse(storage.exists(rendition_names(shared)["thumbnail"]))
+        self.assertFalse(ImageBlob.objects.filter(name=shared).exists())
+
+    def test_reacquired_image_not_collected(self, patched_process, patched_gc):
+        """Test a file used again before the collection runs is kept."""
+        shared = self._upload(self.recipes[0], image_bytes("red"))
+        self.addCleanup(self.recipes[0].image.storage.delete, shared)
+        ImageBlob.objects.release(shared)
+        ImageBlob.objects.acquire(shared)
+
+        delete_orphan_image(shared)
+
+        self.assertTrue(self.recipes[0].image.storage.exists(shared))
+        self.assertEqual(ImageBlob.objects.get(name=shared).ref_count, 1)
+
+
+class ImageCollectionRaceTests(TransactionTestCase):
+    """Test uploads and the collection of the same file are serialized on its ImageBlob row."""
+
+    def setUp(self):
+        self.storage = ContentAddressedStorage()
+        self.content = image_bytes("green")
+        self.name = self.storage.save("uploads/recipe/a.png", ContentFile(self.content))
+        self.addCleanup(self.storage.delete, self.name)
+        # No recipe uses the file, as after the release of the last one
+        self.assertEqual(ImageBlob.objects.get(name=self.name).ref_count, 0)
+
+    def _in_thread(self, target):
+        def run():
+            try:
+                target()
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def test_collection_waits_for_upload_found_file(self):
+        """Test a file found by an upload is kept, the collection waiting for the acquire."""
+        found = threading.Event()
+        acquire = threading.Event()
+
+        def upload():
+            with transaction.atomic():
+                self.assertEqual(
+                    self.storage.save("uploads/recipe/b.png", ContentFile(self.content)),
+                    self.name,
+                )
+                found.set()
+                acquire.wait(5)
+                ImageBlob.objects.acquire(self.name)
+
+        uploader = self._in_thread(upload)
+        self.assertTrue(found.wait(5))
+        collector = self._in_thread(lambda: delete_orphan_image(self.name))
+
+        # Blocked on the row locked by the upload
+        collector.join(0.5)
+        self.assertTrue(collector.is_alive())
+        acquire.set()
+        uploader.join(5)
+        collector.join(5)
+
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertEqual(ImageBlob.objects.get(name=self.name).ref_count, 1)
+
+    def test_upload_during_collection_stores_file_again(self):
+        """Test an upload arriving while the file is collected stores it again."""
+        with transaction.atomic():
+            ImageBlob.objects.lock(self.name)
+            # The collection holds the row, the upload waits for it
+            uploader = self._in_thread(
+                lambda: ImageBlob.objects.acquire(
+                    self.storage.save("uploads/recipe/b.png", ContentFile(self.content))
+                )
+            )
+            uploader.join(0.5)
+            self.assertTrue(uploader.is_alive())
+            delete_orphan_image(self.name)
+        uploader.join(5)
+
+        self.assertTrue(self.storage.exists(self.name))
+        self.assertEqual(ImageBlob.objects.get(name=self.name).ref_count, 1)
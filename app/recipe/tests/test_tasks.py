@@ -0,0 +1,97 @@
+"""
+Tests for the recipe image tasks.
+"""
+
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from PIL import Image
+from recipe.models import ImageBlob, Recipe
+from recipe.tasks import delete_orphan_image, process_recipe_image
+
+
+def image_content(size=(1200, 900), image_format="JPEG", color="red"):
+    """Return an encoded sample image."""
+    buffer = BytesIO()
+    Image.new("RGB", size, color=color).save(buffer, format=image_format)
+    return ContentFile(buffer.getvalue())
+
+
+class ProcessRecipeImageTests(TestCase):
+    """Test validating and resizing uploaded recipe images."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user("user@example.com", "password123")
+        self.recipe = Recipe.objects.create(
+            user=user,
+            title="Sample recipe",
+            time_minutes=10,
+            price=Decimal("5.00"),
+            image_status=Recipe.ImageStatus.PENDING,
+        )
+
+    def tearDown(self):
+        storage = self.recipe.image.storage
+        for path in self.recipe.image_renditions.values():
+            storage.delete(path)
+        self.recipe.image.delete()
+
+    def test_renditions_created(self):
+        """Test renditions are saved, resized, and recorded on the recipe."""
+        self.recipe.image.save("photo.jpg", image_content())
+
+        process_recipe_image(self.recipe.id, self.recipe.image.name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.READY)
+        storage = self.recipe.image.storage
+        expected = {
+            "thumbnail": ("WEBP", (200, 150)),
+            "medium": ("WEBP", (800, 600)),
+            "thumbnail_jpeg": ("JPEG", (200, 150)),
+        }
+        self.assertEqual(set(self.recipe.image_renditions), set(expected))
+        for name, (image_format, size) in expected.items():
+            with storage.open(self.recipe.image_renditions[name]) as file:
+                with Image.open(file) as img:
+                    self.assertEqual(img.format, image_format)
+                    self.assertEqual(img.size, size)
+
+    @patch("recipe.tasks.delete_orphan_image")
+    def test_invalid_image_rejected(self, patched_gc):
+        """Test a file that isn't an image is released and the status set to failed."""
+        self.recipe.image.save("photo.jpg", ContentFile(b"not an image"))
+        name = self.recipe.image.name
+        ImageBlob.objects.acquire(name)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            process_recipe_image(self.recipe.id, name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.FAILED)
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.recipe.image_renditions, {})
+        patched_gc.apply_async.assert_called_once()
+        self.assertEqual(patched_gc.apply_async.call_args.args[0], (name,))
+
+        delete_orphan_image(name)
+
+        self.assertFalse(self.recipe.image.storage.exists(name))
+        self.assertFalse(ImageBlob.objects.filter(name=name).exists())
+
+    def test_replaced_image_skipped(self):
+        """Test a task for an image replaced meanwhile changes nothing."""
+        self.recipe.image.save("old.jpg", image_content(color="blue"))
+        old_name = self.recipe.image.name
+        self.recipe.image.save("new.jpg", image_content())
+
+        process_recipe_image(self.recipe.id, old_name)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_status, Recipe.ImageStatus.PENDING)
+        self.assertEqual(self.recipe.image_renditions, {})
+        self.recipe.image.storage.delete(old_name)
@@ -13,5 +13,11 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
 
+    class Meta:
+        indexes = [
+            # Serves WHERE user_id = ... ORDER BY name DESC, the paginated list
+            models.Index(fields=["user", "name"], name="tag_user_name_idx"),
+        ]
+
     def __str__(self):
         return self.name
@@ -1,3 +1,4 @@
+from app.fast_serializers import CompiledSerializer
 from rest_framework import serializers
 from tags.models import Tag
 
@@ -9,3 +10,7 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ["id", "name"]
         read_only_fields = ["id"]
+
+
+# NOTE: Read only, for the list view (app/fast_serializers.py)
+tag_list_serializer = CompiledSerializer(TagSerializer)
@@ -56,6 +56,20 @@ class PrivateTagsApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_retrieve_tags_paginated(self):
+        """Test ?paginate=true returns pages of tags, following the next links."""
+        for name in ["Breakfast", "Dessert", "Lunch", "Vegan", "Vegan"]:
+            Tag.objects.create(user=self.user, name=name)
+
+        res = self.client.get(TAGS_URL, {"paginate": "true", "size": 2})
+        names = [tag["name"] for tag in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            names += [tag["name"] for tag in res.data["results"]]
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(names, ["Vegan", "Vegan", "Lunch", "Dessert", "Breakfast"])
+
     def test_tags_limited_to_user(self):
         """Test list of tags is limited to authenticated user."""
         user2 = create_user(email="user2@example.com")
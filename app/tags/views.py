@@ -1,8 +1,10 @@
+from app.fast_serializers import CompiledListMixin
+from app.pagination import NameCursorPagination
 from rest_framework import mixins, viewsets
 from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from tags.models import Tag
-from tags.serializers import TagSerializer
+from tags.serializers import TagSerializer, tag_list_serializer
+from user.authentication import ClaimsJWTAuthentication
 
 
 # NOTE: The approach customizes the accessibility, by:
@@ -10,6 +12,7 @@ from tags.serializers import TagSerializer
 #   - Using mixins to provide only the desired actions
 #   - Using a custom queryset to filter the tags to the authenticated user
 class TagViewSet(
+    CompiledListMixin,
     mixins.CreateModelMixin,
     mixins.DestroyModelMixin,
     mixins.UpdateModelMixin,
@@ -19,9 +22,11 @@ class TagViewSet(
     """Manage tags in the database."""
 
     serializer_class = TagSerializer
+    compiled_serializer = tag_list_serializer
     queryset = Tag.objects.all()
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = NameCursorPagination
 
     # Replace the default queryset with a custom one
     # that filters the tags to the authenticated user
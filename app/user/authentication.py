@@ -0,0 +1,172 @@
+"""
+Authentication classes for the APIs.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from user.models import ClaimsUser
+
+TOKEN_VERSION_CLAIM = "token_version"
+TOKEN_VERSION_CACHE_KEY = "auth:token_version:{user_id}"
+TOKEN_VERSION_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Login time, copied into the access tokens made from the refresh token, unlike iat
+AUTH_TIME_CLAIM = "auth_time"
+TOKENS_VALID_AFTER_CACHE_KEY = "auth:tokens_valid_after:{user_id}"
+
+
+class LocalTTLCache:
+    """
+    Small thread safe in-process LRU cache whose entries expire after ttl seconds.
+
+    Sits in front of Redis for the revocation state of users: a hit costs a
+    dictionary lookup. An entry can be up to ttl seconds stale in the other
+    processes, the process revoking a token drops its own entry right away.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+# user id: (token version, tokens valid after)
+revocation_cache = LocalTTLCache(maxsize=10000, ttl=5)
+
+
+def get_revocation_state(user_id):
+    """
+    Return (token version, tokens valid after timestamp) of a user.
+
+    The version is None if the user doesn't exist. Looked up in the local
+    cache, then Redis (one round trip for both), then the database for the version.
+    """
+    state = revocation_cache.get(user_id)
+    if state is not None:
+        return state
+
+    version_key = TOKEN_VERSION_CACHE_KEY.format(user_id=user_id)
+    valid_after_key = TOKENS_VALID_AFTER_CACHE_KEY.format(user_id=user_id)
+    cached = cache.get_many([version_key, valid_after_key])
+    version = cached.get(version_key)
+    if version is None:
+        version = (
+            get_user_model()
+            .objects.filter(pk=user_id)
+            .values_list("token_version", flat=True)
+            .first()
+        )
+        if version is None:
+            # NOTE: Not kept locally, a user created right after must not be refused
+            return None, 0
+        cache.set(version_key, version, TOKEN_VERSION_CACHE_TIMEOUT)
+
+    state = (version, cached.get(valid_after_key, 0))
+    revocation_cache.set(user_id, state)
+    return state
+
+
+def check_token_revocation(payload):
+    """Return the current token version, raise AuthenticationFailed if the token was revoked."""
+    user_id = payload[api_settings.USER_ID_CLAIM]
+    version, valid_after = get_revocation_state(user_id)
+    if version is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if payload.get(TOKEN_VERSION_CLAIM, 0) != version:
+        raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+    # Tokens issued before the auth_time claim existed fall back to iat
+    if payload.get(AUTH_TIME_CLAIM, payload.get("iat", 0)) < valid_after:
+        raise AuthenticationFailed(_("Token has been revoked"), code="token_revoked")
+    return version
+
+
+def bump_token_version(user_id):
+    """Invalidate every token issued to a user so far, durably (database)."""
+    get_user_model().objects.filter(pk=user_id).update(
+        token_version=F("token_version") + 1
+    )
+
+    # NOTE: After commit, otherwise a request could cache the old version again before it
+    def forget_version():
+        cache.delete(TOKEN_VERSION_CACHE_KEY.format(user_id=user_id))
+        revocation_cache.delete(user_id)
+
+    transaction.on_commit(forget_version)
+
+
+def revoke_tokens(user_id):
+    """
+    Invalidate every token issued to a user so far, without a database write.
+
+    Stores the time in Redis: tokens logged in before it are refused. The key
+    expires once all of them have expired anyway, so unlike the token_blacklist
+    app nothing grows without bound.
+    """
+    timeout = api_settings.REFRESH_TOKEN_LIFETIME + api_settings.ACCESS_TOKEN_LIFETIME
+    cache.set(
+        TOKENS_VALID_AFTER_CACHE_KEY.format(user_id=user_id),
+        time.time(),
+        int(timeout.total_seconds()),
+    )
+    revocation_cache.delete(user_id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication without loading the user row on every request.
+
+    JWTAuthentication runs SELECT ... FROM core_user on each request. The token
+    already carries user_id and is_staff, so this class only checks the token
+    was not revoked (token version, tokens valid after) and returns a
+    user.models.ClaimsUser. Tokens issued before the token_version claim
+    existed count as version 0.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        version = check_token_revocation(validated_token)
+        return ClaimsUser.from_claims(
+            validated_token[api_settings.USER_ID_CLAIM],
+            validated_token.get("is_staff", False),
+            version,
+        )
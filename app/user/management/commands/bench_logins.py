@@ -0,0 +1,120 @@
+"""
+Django command to benchmark logins per second per core at several password hashing costs.
+
+Usage:
+    python manage.py bench_logins --logins 50
+    python manage.py bench_logins --argon2 2,19456,1 --argon2 3,65536,1 --pbkdf2 600000
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from user.views import UserTokenObtainPairView
+
+BENCH_EMAIL = "bench_logins@example.com"
+BENCH_PASSWORD = "bench-password-123"
+
+# (time cost, memory cost KiB, parallelism)
+DEFAULT_ARGON2_COSTS = ["1,47104,1", "2,19456,1", "3,65536,1", "2,102400,8"]
+DEFAULT_PBKDF2_ITERATIONS = [260000, 600000, 1000000]
+
+
+class Command(BaseCommand):
+    """Time full logins (one process, so one core) and the password check alone."""
+
+    help = __doc__
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=50)
+        parser.add_argument(
+            "--argon2",
+            action="append",
+            help="Argon2 costs as time_cost,memory_cost_kib,parallelism. Repeatable.",
+        )
+        parser.add_argument(
+            "--pbkdf2", action="append", type=int, help="PBKDF2 iterations. Repeatable."
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        cases = []
+        for costs in options["argon2"] or DEFAULT_ARGON2_COSTS:
+            time_cost, memory_cost, parallelism = map(int, costs.split(","))
+            cases.append(
+                (
+                    f"argon2 t={time_cost} m={memory_cost // 1024}MiB p={parallelism}",
+                    "core.hashers.Argon2PasswordHasher",
+                    {
+                        "ARGON2_TIME_COST": time_cost,
+                        "ARGON2_MEMORY_COST": memory_cost,
+                        "ARGON2_PARALLELISM": parallelism,
+                    },
+                )
+            )
+        for iterations in options["pbkdf2"] or DEFAULT_PBKDF2_ITERATIONS:
+            cases.append(
+                (
+                    f"pbkdf2 {iterations} iterations",
+                    "core.hashers.PBKDF2PasswordHasher",
+                    {"PBKDF2_ITERATIONS": iterations},
+                )
+            )
+
+        user = get_user_model().objects.create_user(email=BENCH_EMAIL)
+        try:
+            self.stdout.write(
+                f"{'hasher':<32} {'logins/s/core':>13} {'p50 ms':>8} {'p99 ms':>8} "
+                f"{'hash ms':>8} {'hash %':>7}"
+            )
+            for label, hasher, costs in cases:
+                hashers = [hasher] + [h for h in settings.PASSWORD_HASHERS if h != hasher]
+                with override_settings(
+                    PASSWORD_HASHERS=hashers,
+                    PASSWORD_HASHING={**settings.PASSWORD_HASHING, **costs},
+                ):
+                    self._bench(label, user, options["logins"])
+        finally:
+            user.delete()
+
+    def _bench(self, label, user, logins):
+        # Hashed with the costs under test, so the logins don't rehash it
+        user.set_password(BENCH_PASSWORD)
+        user.save(update_fields=["password"])
+
+        # Without the login throttle, which would stop the benchmark
+        view = UserTokenObtainPairView.as_view(throttle_classes=[])
+        factory = APIRequestFactory()
+        payload = {"email": BENCH_EMAIL, "password": BENCH_PASSWORD}
+
+        def login():
+            response = view(factory.post("/api/login", payload, format="json"))
+            assert response.status_code == 200, response.data
+
+        login()  # warm up
+
+        latencies = []
+        cpu_start = time.process_time()
+        for _ in range(logins):
+            start = time.perf_counter()
+            login()
+            latencies.append((time.perf_counter() - start) * 1000)
+        # NOTE: CPU time rather than wall time, per core even with other load on the machine
+        cpu_per_login = (time.process_time() - cpu_start) / logins
+
+        hash_start = time.process_time()
+        for _ in range(logins):
+            user.check_password(BENCH_PASSWORD)
+        hash_per_login = (time.process_time() - hash_start) / logins
+
+        latencies.sort()
+        self.stdout.write(
+            f"{label:<32} {1 / cpu_per_login:>13.1f} {statistics.median(latencies):>8.1f} "
+            f"{latencies[int(len(latencies) * 0.99) - 1]:>8.1f} "
+            f"{hash_per_login * 1000:>8.1f} {hash_per_login / cpu_per_login * 100:>6.0f}%"
+        )
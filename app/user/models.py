@@ -1,3 +1,73 @@
-from django.db import models
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import router
 
-# Create your models here.
+USER_CACHE_KEY = "auth:user:{user_id}"
+# Short, the cached copy may lag behind profile updates made by other processes
+USER_CACHE_TIMEOUT = 60
+# Loaded on demand from the cache, password stays out of it
+CACHED_USER_FIELDS = [
+    field.attname
+    for field in get_user_model()._meta.concrete_fields
+    if field.attname != "password"
+]
+
+
+class ClaimsUser(get_user_model()):
+    """
+    User built from the claims of a JWT, without a database query.
+
+    Only id, is_staff and is_active come from the token, every other field is
+    deferred, like with User.objects.only(...). The first access to one of them
+    loads them all from a short lived cache entry, or from the database on a miss:
+        request.user.is_staff  # token claim, free
+        request.user.email     # cache (or one query), then free for the request
+    Being a (proxy) User instance, it works wherever the ORM expects a user,
+    e.g. Recipe.objects.filter(user=request.user).
+    """
+
+    class Meta:
+        proxy = True
+
+    @classmethod
+    def from_claims(cls, user_id, is_staff, token_version):
+        claims = {
+            "id": user_id,
+            "is_staff": is_staff,
+            # Tokens are only issued to active users, deactivating bumps token_version
+            "is_active": True,
+            "token_version": token_version,
+        }
+        fields = [f.attname for f in cls._meta.concrete_fields if f.attname in claims]
+        return cls.from_db(
+            router.db_for_read(cls), fields, [claims[name] for name in fields]
+        )
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        # NOTE: Accessing a deferred field calls refresh_from_db(fields=[name])
+        if fields is not None:
+            self._load_cached_fields()
+            fields = [name for name in fields if name in self.get_deferred_fields()]
+            if not fields:
+                return
+        super().refresh_from_db(using, fields, **kwargs)
+
+    def _load_cached_fields(self):
+        key = USER_CACHE_KEY.format(user_id=self.pk)
+        cached = cache.get(key)
+        if cached is None or cached["token_version"] != self.token_version:
+            values = (
+                get_user_model()
+                .objects.filter(pk=self.pk)
+                .values(*CACHED_USER_FIELDS)
+                .first()
+            )
+            if values is None:
+                raise get_user_model().DoesNotExist()
+            cached = values
+            cache.set(key, cached, USER_CACHE_TIMEOUT)
+
+        deferred = self.get_deferred_fields()
+        for name, value in cached.items():
+            if name in deferred:
+                setattr(self, name, value)
@@ -0,0 +1,16 @@
+"""
+OpenAPI (drf-spectacular) extensions of the user app.
+"""
+
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+
+class ClaimsJWTScheme(SimpleJWTScheme):
+    """
+    Document ClaimsJWTAuthentication as the bearer JWT scheme (jwtAuth).
+
+    The simplejwt extension of drf-spectacular only matches JWTAuthentication
+    itself, not its subclasses.
+    """
+
+    target_class = "user.authentication.ClaimsJWTAuthentication"
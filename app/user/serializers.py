@@ -2,12 +2,17 @@
 Serializers for the user API View.
 """
 
+import time
 from typing import Any, Dict
 
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 from rest_framework import serializers
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from user.authentication import check_token_revocation, revoke_tokens
 
 # NOTE: This serializer works in both directions:
 # 1. From Python to JSON: Serializes the data for the response
@@ -58,6 +63,9 @@ class UserSerializer(serializers.ModelSerializer):
         if password:
             user.set_password(password)
             user.save()
+            # NOTE: Logs out every session, the one changing the password too:
+            # all tokens issued so far are refused, the client logs in again
+            revoke_tokens(user.pk)
 
         return user
 
@@ -88,4 +96,16 @@ class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Add essential data needed throughout the session to encode in the token
         token["user_id"] = user.id
         token["is_staff"] = user.is_staff  # Useful for permission checks
+        # NOTE: Checked by user.authentication.ClaimsJWTAuthentication, for revocation
+        token["token_version"] = user.token_version
+        # NOTE: Unlike iat, copied into the access tokens made from this refresh token
+        token["auth_time"] = time.time()
         return token
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Token refresh serializer refusing revoked refresh tokens."""
+
+    def validate(self, attrs):
+        check_token_revocation(self.token_class(attrs["refresh"]).payload)
+        return super().validate(attrs)
@@ -1,3 +1,6 @@
+import time
+
+from app.fast_serializers import CompiledSerializer
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext as _
 from rest_framework import serializers
@@ -30,6 +33,8 @@ class AdminTokenObtainPairSerializer(TokenObtainPairSerializer):
         # Add essential data to token
         token["user_id"] = user.id
         token["is_staff"] = user.is_staff
+        token["token_version"] = user.token_version
+        token["auth_time"] = time.time()
         return token
 
 class AdminUserSerializer(serializers.ModelSerializer):
@@ -38,3 +43,7 @@ class AdminUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = get_user_model()
         fields = ["id", "email", "name", "is_active", "is_staff"]
+
+
+# NOTE: Read only, for the list view (app/fast_serializers.py)
+admin_user_list_serializer = CompiledSerializer(AdminUserSerializer)
@@ -0,0 +1,15 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import USER_CACHE_KEY, ClaimsUser
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+@receiver([post_save, post_delete], sender=ClaimsUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    """
+    Drop the cached copy of a user read by ClaimsUser when the user changes.
+    """
+    cache.delete(USER_CACHE_KEY.format(user_id=instance.pk))
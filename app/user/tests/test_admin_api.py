@@ -2,6 +2,8 @@
 Tests for admin-only user API endpoints.
 """
 
+import json
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase
 from django.urls import reverse
@@ -64,6 +66,20 @@ class AdminUserApiTests(TestCase):
         for field in required_fields:
             self.assertIn(field, user_data)
 
+    def test_list_users_streamed(self):
+        """Test admin can export the users as a streamed list."""
+        self.client.force_authenticate(self.admin_user)
+
+        res = self.client.get(USERS_LIST_URL, {"stream": "true"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        users = json.loads(b"".join(res.streaming_content))
+        self.assertEqual(
+            sorted(user["email"] for user in users),
+            ["admin@example.com", "user@example.com"],
+        )
+        self.assertNotIn("password", users[0])
+
     def test_list_users_regular_user_denied(self):
         """Test regular user cannot access users list."""
         # Get JWT token for regular user
@@ -0,0 +1,188 @@
+"""
+Tests for the claims based JWT authentication.
+"""
+
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from drf_spectacular.generators import SchemaGenerator
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from tags.models import Tag
+from user.authentication import revocation_cache
+from user.models import ClaimsUser
+
+USER_LOGIN_URL = reverse("user_login")
+TOKEN_REFRESH_URL = reverse("token_refresh")
+LOGOUT_URL = reverse("user:logout")
+TAGS_URL = reverse("tags:tag-list")
+ME_URL = reverse("user:me")
+
+
+def admin_detail_url(user_id):
+    return reverse("user:admin_user_detail", args=[user_id])
+
+
+class ClaimsJWTAuthenticationTests(TestCase):
+    """Test requests are authenticated from the token claims."""
+
+    def setUp(self):
+        cache.clear()
+        revocation_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email="user@example.com", password="userpass123", name="Regular User"
+        )
+        self.admin = get_user_model().objects.create_user(
+            email="admin@example.com", password="adminpass123", is_staff=True
+        )
+        self.client = APIClient()
+
+    def _login(self, client, email, password):
+        res = client.post(USER_LOGIN_URL, {"email": email, "password": password})
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        return res.data
+
+    def test_no_user_query_per_request(self):
+        """Test an authenticated request doesn't load the user row."""
+        self._login(self.client, "user@example.com", "userpass123")
+        self.client.get(TAGS_URL)  # caches the token version
+
+        # Only the tags query, and the revocation state comes from the local cache
+        with self.assertNumQueries(1), patch("user.authentication.cache") as patched_cache:
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(patched_cache.method_calls, [])
+
+    def test_claims_user_works_with_orm(self):
+        """Test objects created with the claims user belong to the user."""
+        self._login(self.client, "user@example.com", "userpass123")
+
+        res = self.client.post(TAGS_URL, {"name": "Vegan"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Tag.objects.get().user, self.user)
+
+    def test_claims_user_loads_other_fields_once(self):
+        """Test fields missing from the claims are loaded, then served from cache."""
+        user = ClaimsUser.from_claims(self.user.id, False, 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "user@example.com")
+            self.assertEqual(user.name, "Regular User")
+
+        other_request_user = ClaimsUser.from_claims(self.user.id, False, 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(other_request_user.email, "user@example.com")
+
+    def test_profile_update_refreshes_cached_user(self):
+        """Test the cached copy of the user is dropped when the user is saved."""
+        ClaimsUser.from_claims(self.user.id, False, 0).name  # fill the cache
+        self.user.name = "New Name"
+        self.user.save()
+
+        user = ClaimsUser.from_claims(self.user.id, False, 0)
+
+        self.assertEqual(user.name, "New Name")
+
+    def test_access_change_revokes_tokens(self):
+        """Test tokens issued before an is_staff/is_active change are refused."""
+        self._login(self.client, "user@example.com", "userpass123")
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+        admin_client = APIClient()
+        self._login(admin_client, "admin@example.com", "adminpass123")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = admin_client.patch(admin_detail_url(self.user.id), {"is_staff": True})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        # A new login gets a token with the new version
+        self._login(self.client, "user@example.com", "userpass123")
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+    def test_name_change_keeps_tokens(self):
+        """Test updating other fields doesn't revoke the tokens."""
+        self._login(self.client, "user@example.com", "userpass123")
+        admin_client = APIClient()
+        self._login(admin_client, "admin@example.com", "adminpass123")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.patch(admin_detail_url(self.user.id), {"name": "Renamed"})
+
+        self.assertEqual(self.client.get(ME_URL).data["name"], "Renamed")
+
+    def test_deleted_user_token_refused(self):
+        """Test the token of a deleted user stops working."""
+        self._login(self.client, "user@example.com", "userpass123")
+        self.client.get(TAGS_URL)
+        admin_client = APIClient()
+        self._login(admin_client, "admin@example.com", "adminpass123")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin_client.delete(admin_detail_url(self.user.id))
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_revokes_tokens(self):
+        """Test logging out refuses the access and refresh tokens issued before."""
+        tokens = self._login(self.client, "user@example.com", "userpass123")
+        other_client = APIClient()
+        self._login(other_client, "user@example.com", "userpass123")
+
+        res = self.client.post(LOGOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(other_client.get(TAGS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_after_logout(self):
+        """Test tokens from a login after the logout are accepted, refreshed ones too."""
+        self._login(self.client, "user@example.com", "userpass123")
+        self.client.post(LOGOUT_URL)
+
+        tokens = self._login(self.client, "user@example.com", "userpass123")
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {res.data['access']}")
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+    def test_password_change_revokes_all_tokens(self):
+        """Test changing the password refuses every token, the caller's too."""
+        tokens = self._login(self.client, "user@example.com", "userpass123")
+        other_client = APIClient()
+        self._login(other_client, "user@example.com", "userpass123")
+
+        res = self.client.patch(ME_URL, {"password": "newpass123"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(other_client.get(TAGS_URL).status_code, status.HTTP_401_UNAUTHORIZED)
+        res = APIClient().post(TOKEN_REFRESH_URL, {"refresh": tokens["refresh"]})
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Logging in with the new password works again
+        self._login(self.client, "user@example.com", "newpass123")
+        self.assertEqual(self.client.get(TAGS_URL).status_code, status.HTTP_200_OK)
+
+
+class ClaimsJWTSchemaTests(SimpleTestCase):
+    """Test the OpenAPI schema documents the claims JWT authentication."""
+
+    def test_bearer_scheme(self):
+        """Test endpoints authenticated with ClaimsJWTAuthentication require jwtAuth."""
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+
+        self.assertEqual(
+            schema["components"]["securitySchemes"]["jwtAuth"],
+            {"type": "http", "scheme": "bearer", "bearerFormat": "JWT"},
+        )
+        self.assertIn({"jwtAuth": []}, schema["paths"]["/api/user/me/"]["get"]["security"])
@@ -16,6 +16,7 @@ urlpatterns = [
     # 3. Create links in app without hardcoding URLs
     path("create/", views.CreateUserView.as_view(), name="create"),
     path("me/", views.ManageUserView.as_view(), name="me"),
+    path("logout/", views.LogoutAllView.as_view(), name="logout"),
     # Admin only endpoints
     path(
         "admin/list/", views_admin.AdminListUsersView.as_view(), name="admin_user_list"
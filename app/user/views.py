@@ -3,9 +3,12 @@ Views for the user API.
 """
 
 from django.contrib.auth import get_user_model
-from rest_framework import generics, permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenObtainPairView
+from user.authentication import ClaimsJWTAuthentication, revoke_tokens
 from user.serializers import UserTokenObtainPairSerializer, UserSerializer
 
 
@@ -27,13 +30,27 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 
     # NOTE: serializers are to handle interaction with the DB model
     serializer_class = UserSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     # get_object() is a method defined within generics.RetrieveUpdateAPIView
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
+        # NOTE: request.user only holds the token claims (user.models.ClaimsUser),
+        # the profile is read and updated from the current row
+        return get_user_model().objects.get(pk=self.request.user.pk)
+
+
+class LogoutAllView(APIView):
+    """Revoke every token issued to the authenticated user."""
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    @extend_schema(request=None, responses={204: None})
+    def post(self, request):
+        revoke_tokens(request.user.pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
 class UserTokenObtainPairView(TokenObtainPairView):
@@ -1,15 +1,21 @@
+from app.fast_serializers import CompiledListMixin
 from django.contrib.auth import get_user_model
 from rest_framework import generics, permissions
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.views import TokenObtainPairView
-from user.serializers_admin import AdminUserSerializer, AdminTokenObtainPairSerializer
+from user.authentication import ClaimsJWTAuthentication, bump_token_version
+from user.serializers_admin import (
+    AdminTokenObtainPairSerializer,
+    AdminUserSerializer,
+    admin_user_list_serializer,
+)
 
 
-class AdminListUsersView(generics.ListAPIView):
-    """List all users - admin only endpoint."""
+class AdminListUsersView(CompiledListMixin, generics.ListAPIView):
+    """List all users - admin only endpoint, ?stream=true for a streamed export."""
 
     serializer_class = AdminUserSerializer
-    authentication_classes = [JWTAuthentication]
+    compiled_serializer = admin_user_list_serializer
+    authentication_classes = [ClaimsJWTAuthentication]
 
     # NOTE: permissions.IsAdminUser is a DRF built-in permission class
     # that checks if the requesting user's is_staff attribute is True
@@ -22,7 +28,7 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Retrieve or update a specific user - admin only endpoint."""
 
     serializer_class = AdminUserSerializer
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [ClaimsJWTAuthentication]
     permission_classes = [permissions.IsAdminUser]
 
     # Get the User model that's defined in settings.AUTH_USER_MODEL
@@ -31,6 +37,20 @@ class AdminUserDetailView(generics.RetrieveUpdateDestroyAPIView):
     # The lookup field is 'id' by default, but explicitly specify
     lookup_field = "pk"  # primary key, which is the 'id'
 
+    def perform_update(self, serializer):
+        user = serializer.instance
+        access_before = (user.is_active, user.is_staff)
+        user = serializer.save()
+        # NOTE: Tokens carry is_staff and are only issued to active users,
+        # the ones issued before the change must stop working
+        if (user.is_active, user.is_staff) != access_before:
+            bump_token_version(user.pk)
+
+    def perform_destroy(self, instance):
+        user_id = instance.pk
+        instance.delete()
+        bump_token_version(user_id)
+
 class AdminTokenObtainPairView(TokenObtainPairView):
     """Custom token view using our serializer"""
 